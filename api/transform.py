@@ -5,12 +5,19 @@ directory.
 """
 
 from http.server import BaseHTTPRequestHandler
-from tornado_async_transformer import TornadoAsyncTransformer, TransformError
+from tornado_async_transformer.tool import might_transform
 import json
-import libcst
 
 
 def transform(source: str) -> str:
+    # sources the pre-scan rules out are returned as is, sparing a cold start
+    # from importing libcst
+    if not might_transform(source.encode()):
+        return source
+
+    import libcst
+    from tornado_async_transformer import TornadoAsyncTransformer
+
     source_tree = libcst.parse_module(source)
     visited_tree = source_tree.visit(TornadoAsyncTransformer())
     return visited_tree.code
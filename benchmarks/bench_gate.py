@@ -0,0 +1,303 @@
+"""
+A performance regression gate: measures TornadoAsyncTransformer's throughput
+and peak memory over the tests/test_cases corpus and scaled up versions of it,
+and fails if either regressed past a threshold compared to the baseline stored
+in benchmarks/baseline.json.
+
+    python -m benchmarks.bench_gate
+    python -m benchmarks.bench_gate --update
+
+Throughput is measured in bytes per unit of a fixed, pure python calibration
+workload rather than bytes per second, so that baselines recorded on one
+machine carry over to faster or slower ones. The calibration workload is run
+right before every sample, so that it's also slowed down by whatever else is
+slowing the machine down at the time.
+
+Peak memory is the lowest of several runs, each in a fresh interpreter, so
+that it doesn't depend on what earlier measurements left allocated.
+
+Baselines only carry over between machines, not between versions of python
+or libcst, so the gate refuses to compare against a baseline recorded with
+different ones.
+"""
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Sequence, Tuple
+
+from tornado_async_transformer.api import transform_source
+from tornado_async_transformer.cache import _libcst_version
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+TEST_CASES = os.path.join(os.path.dirname(__file__), "..", "tests", "test_cases")
+
+# every module of the corpus is also measured repeated this many times over,
+# to cover files much bigger than the test cases themselves
+SCALES = (1, 10, 50)
+
+# allowed regressions, as fractions of the baseline
+THROUGHPUT_THRESHOLD = 0.15
+MEMORY_THRESHOLD = 0.10
+
+# how many fresh interpreters peak memory is measured in
+MEMORY_RUNS = 3
+
+# how many times the combined relative spread of the baseline and the current
+# measurement a regression has to exceed, on top of the threshold, to fail the
+# gate
+NOISE_TOLERANCE = 2.0
+
+
+class Measurement(NamedTuple):
+    # median bytes transformed per unit of calibration workload
+    throughput: float
+    # median absolute deviation of the throughput samples, relative to the median
+    spread: float
+    # the lowest of the runs' peaks, in bytes, as traced by tracemalloc
+    peak_memory: int
+    # the range of the runs' peaks, relative to the lowest
+    memory_spread: float = 0.0
+
+
+def corpus() -> List[str]:
+    sources = []
+    for name in sorted(os.listdir(TEST_CASES)):
+        before = os.path.join(TEST_CASES, name, "before.py")
+        if os.path.isfile(before):
+            with open(before) as before_file:
+                sources.append(before_file.read())
+    return sources
+
+
+def _workload_name(scale: int) -> str:
+    return "test_cases" if scale == 1 else "test_cases x{}".format(scale)
+
+
+def workloads() -> Dict[str, List[str]]:
+    sources = corpus()
+    return {
+        _workload_name(scale): ["\n".join([source] * scale) for source in sources]
+        for scale in SCALES
+    }
+
+
+def _calibration_workload() -> None:
+    counts: Dict[str, int] = {}
+    for index in range(200000):
+        key = "key-{}".format(index % 1000)
+        counts[key] = counts.get(key, 0) + 1
+
+
+def _time(function: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def relative_spread(values: Sequence[float]) -> float:
+    """
+    The median absolute deviation of `values`, relative to their median.
+
+    >>> relative_spread([9.0, 10.0, 10.0, 11.0, 30.0])
+    0.1
+    """
+    median = statistics.median(values)
+    return statistics.median(abs(value - median) for value in values) / median
+
+
+def _transform_all(sources: Sequence[str]) -> None:
+    for source in sources:
+        transform_source(source)
+
+
+def _traced_peak_memory(sources: Sequence[str]) -> int:
+    # warm up, so that e.g. importing libcst isn't measured
+    _transform_all(sources)
+    gc.collect()
+
+    tracemalloc.start()
+    try:
+        _transform_all(sources)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak_memory
+
+
+def measure_peak_memory(workload: str, runs: int = MEMORY_RUNS) -> Tuple[int, float]:
+    """
+    The lowest peak memory of transforming `workload` over `runs` fresh
+    interpreters, along with the range of the peaks relative to it.
+    """
+    peaks = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_gate", "--peak-memory", workload],
+            cwd=os.path.join(os.path.dirname(__file__), ".."),
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout
+        peaks.append(int(output))
+    return min(peaks), (max(peaks) - min(peaks)) / min(peaks)
+
+
+def measure(workload: str, sources: Sequence[str], samples: int) -> Measurement:
+    # warm up, so that e.g. importing libcst isn't measured
+    _transform_all(sources)
+
+    size = sum(len(source.encode()) for source in sources)
+    throughputs = []
+    for _ in range(samples):
+        calibration = _time(_calibration_workload)
+        throughputs.append(
+            size / (_time(lambda: _transform_all(sources)) / calibration)
+        )
+
+    return Measurement(
+        statistics.median(throughputs),
+        relative_spread(throughputs),
+        *measure_peak_memory(workload)
+    )
+
+
+def compare(
+    baseline: Measurement,
+    current: Measurement,
+    throughput_threshold: float = THROUGHPUT_THRESHOLD,
+    memory_threshold: float = MEMORY_THRESHOLD,
+) -> List[str]:
+    """
+    Descriptions of how `current` regressed compared to `baseline`, if it did.
+    A regression only counts if it's bigger than the threshold plus the noise
+    in both measurements.
+
+    >>> compare(Measurement(100.0, 0.01, 1000), Measurement(80.0, 0.01, 1000))
+    ['throughput dropped 20.0% (allowed 17.8%)']
+    >>> compare(Measurement(100.0, 0.01, 1000), Measurement(80.0, 0.05, 1000))
+    []
+    """
+    regressions = []
+    allowed = throughput_threshold + NOISE_TOLERANCE * math.hypot(
+        baseline.spread, current.spread
+    )
+    drop = 1 - current.throughput / baseline.throughput
+    if drop > allowed:
+        regressions.append(
+            "throughput dropped {:.1%} (allowed {:.1%})".format(drop, allowed)
+        )
+
+    allowed = memory_threshold + NOISE_TOLERANCE * math.hypot(
+        baseline.memory_spread, current.memory_spread
+    )
+    growth = current.peak_memory / baseline.peak_memory - 1
+    if growth > allowed:
+        regressions.append(
+            "peak memory grew {:.1%} (allowed {:.1%})".format(growth, allowed)
+        )
+    return regressions
+
+
+def _environment() -> Dict[str, str]:
+    # patch releases of python don't move the measurements
+    python = ".".join(platform.python_version_tuple()[:2])
+    return {"python": python, "libcst": _libcst_version()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", type=str, default=BASELINE)
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Record the measurements as the new baseline instead of comparing.",
+    )
+    parser.add_argument("--samples", type=int, default=9, help="Runs per workload.")
+    parser.add_argument(
+        "--throughput-threshold", type=float, default=THROUGHPUT_THRESHOLD
+    )
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD)
+    # used by measure_peak_memory, to measure a workload in a fresh interpreter
+    parser.add_argument("--peak-memory", type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.peak_memory:
+        print(_traced_peak_memory(workloads()[args.peak_memory]))
+        return
+
+    if not args.update:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["environment"] != _environment():
+            sys.exit(
+                "{} was recorded with {}, but this is {}. Run the gate with the "
+                "pinned versions, or re-record the baseline with --update.".format(
+                    args.baseline, baseline["environment"], _environment()
+                )
+            )
+
+    measurements = {
+        name: measure(name, sources, args.samples)
+        for name, sources in workloads().items()
+    }
+
+    if args.update:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(
+                {
+                    "environment": _environment(),
+                    "workloads": {
+                        name: {
+                            "throughput": round(measurement.throughput, 1),
+                            "spread": round(measurement.spread, 4),
+                            "peak_memory": measurement.peak_memory,
+                            "memory_spread": round(measurement.memory_spread, 4),
+                        }
+                        for name, measurement in measurements.items()
+                    },
+                },
+                baseline_file,
+                indent=2,
+                sort_keys=True,
+            )
+            baseline_file.write("\n")
+        print("Wrote a new baseline to {}".format(args.baseline))
+        return
+
+    failed = False
+    for name, measurement in measurements.items():
+        if name not in baseline["workloads"]:
+            print("{:<20} no baseline".format(name))
+            continue
+        regressions = compare(
+            Measurement(**baseline["workloads"][name]),
+            measurement,
+            args.throughput_threshold,
+            args.memory_threshold,
+        )
+        failed = failed or bool(regressions)
+        print(
+            "{:<20} {:>10.0f} bytes/unit ±{:>5.1%} {:>8.0f} KiB peak +{:>5.1%}  {}".format(
+                name,
+                measurement.throughput,
+                measurement.spread,
+                measurement.peak_memory / 1024,
+                measurement.memory_spread,
+                "; ".join(regressions) or "ok",
+            )
+        )
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
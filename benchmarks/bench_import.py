@@ -0,0 +1,82 @@
+"""
+Measures how long importing the commandline tool and the library api takes in
+a fresh interpreter, with `python -X importtime`, and which modules it's spent
+on.
+
+    python -m benchmarks.bench_import
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Sequence
+
+MODULES = (
+    "tornado_async_transformer",
+    "tornado_async_transformer.tool",
+    "tornado_async_transformer.api",
+)
+
+# `import time: self [us] | cumulative | imported package`
+_importtime_line = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+class ImportTime(NamedTuple):
+    module: str
+    # microseconds spent importing the module itself, and including its imports
+    own: int
+    cumulative: int
+
+
+def import_times(module: str) -> List[ImportTime]:
+    """
+    Every module imported by importing `module` in a fresh interpreter, in the
+    order `-X importtime` reports them, i.e. `module` itself last.
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    ).stderr
+
+    times: List[ImportTime] = []
+    for line in output.splitlines():
+        match = _importtime_line.match(line)
+        if match is not None:
+            times.append(
+                ImportTime(match.group(4), int(match.group(1)), int(match.group(2)))
+            )
+    return times
+
+
+def best_import_time(module: str, repeat: int) -> Dict[str, ImportTime]:
+    """
+    The import times of `module`'s imports, from the run in which importing
+    `module` was fastest, by module.
+    """
+    runs = [import_times(module) for _ in range(repeat)]
+    fastest = min(runs, key=lambda times: times[-1].cumulative)
+    return {time.module: time for time in fastest}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    modules: Sequence[str] = args.modules
+    for module in modules:
+        times = best_import_time(module, args.repeat)
+        print("{:<44} {:>10.1f} ms".format(module, times[module].cumulative / 1e3))
+        slowest = sorted(times.values(), key=lambda time: time.own, reverse=True)
+        for time in slowest[: args.top]:
+            print("    {:<40} {:>10.1f} ms".format(time.module, time.own / 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Compares matching decorators and calls with the full `some_version_of` matchers
+against first checking their rightmost name.
+
+    python -m benchmarks.bench_matchers
+"""
+
+import argparse
+import timeit
+from typing import Callable, List, Sequence, Tuple
+
+import libcst as cst
+from libcst import matchers as m
+
+from tornado_async_transformer.helpers import matches_by_terminal_name
+from tornado_async_transformer.tornado_async_transformer import (
+    coroutine_decorator_matcher,
+    coroutine_decorator_names,
+    gen_sleep_matcher,
+    gen_sleep_names,
+)
+
+# a realistic mix, where most decorators and calls aren't tornado's
+DECORATORS = (
+    "property",
+    "staticmethod",
+    "functools.lru_cache(maxsize=None)",
+    'route("/users/:id")',
+    "pytest.mark.parametrize('value', [1, 2])",
+    "gen.coroutine",
+    "tornado.gen.coroutine",
+    "gen_test",
+)
+CALLS = (
+    "print(value)",
+    "self.fetch('/ping')",
+    "json.dumps(body)",
+    "'{}'.format(name)",
+    "os.path.join(root, name)",
+    "gen.sleep(1)",
+)
+
+
+def _decorators() -> List[cst.Decorator]:
+    return [
+        cst.Decorator(decorator=cst.parse_expression(source)) for source in DECORATORS
+    ]
+
+
+def _calls() -> List[cst.Call]:
+    return [cst.ensure_type(cst.parse_expression(source), cst.Call) for source in CALLS]
+
+
+def _benchmark(
+    label: str, check: Callable[[], object], number: int, repeat: int
+) -> float:
+    best = min(timeit.repeat(check, number=number, repeat=repeat))
+    print("{:<44} {:>10.2f} us".format(label, best / number * 1e6))
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    decorators = _decorators()
+    calls = _calls()
+
+    # both approaches have to agree before their speed is worth comparing
+    for decorator in decorators:
+        assert m.matches(decorator, coroutine_decorator_matcher) == (
+            matches_by_terminal_name(
+                decorator,
+                decorator.decorator,
+                coroutine_decorator_names,
+                coroutine_decorator_matcher,
+            )
+        )
+    for call in calls:
+        assert m.matches(call, gen_sleep_matcher) == matches_by_terminal_name(
+            call, call.func, gen_sleep_names, gen_sleep_matcher
+        )
+
+    cases: Sequence[Tuple[str, Callable[[], object], Callable[[], object]]] = (
+        (
+            "{} decorators".format(len(decorators)),
+            lambda: [m.matches(d, coroutine_decorator_matcher) for d in decorators],
+            lambda: [
+                matches_by_terminal_name(
+                    d,
+                    d.decorator,
+                    coroutine_decorator_names,
+                    coroutine_decorator_matcher,
+                )
+                for d in decorators
+            ],
+        ),
+        (
+            "{} calls".format(len(calls)),
+            lambda: [m.matches(call, gen_sleep_matcher) for call in calls],
+            lambda: [
+                matches_by_terminal_name(
+                    call, call.func, gen_sleep_names, gen_sleep_matcher
+                )
+                for call in calls
+            ],
+        ),
+    )
+    for label, full_match, fast_path in cases:
+        full = _benchmark(
+            label + ", name_attr_possibilities", full_match, args.number, args.repeat
+        )
+        fast = _benchmark(
+            label + ", terminal name first", fast_path, args.number, args.repeat
+        )
+        print("{:<44} {:>10.1f}x".format("speedup", full / fast))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmarks parsing, visiting with TornadoAsyncTransformer and code generation
+separately, over synthetic modules of increasing size and coroutine count.
+
+    python -m benchmarks.bench_transform
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, List, NamedTuple, Sequence, TypeVar
+
+import libcst as cst
+
+from benchmarks.corpus import generate_module
+from tornado_async_transformer import TornadoAsyncTransformer
+from tornado_async_transformer.tool import find_trigger_names
+
+T = TypeVar("T")
+
+
+class PhaseTimings(NamedTuple):
+    """
+    Median seconds taken to process every source in a corpus, per phase.
+    """
+
+    files: int
+    size: int
+    parse: float
+    visit: float
+    codegen: float
+
+    def files_per_second(self, phase: str) -> float:
+        return self.files / getattr(self, phase)
+
+    def bytes_per_second(self, phase: str) -> float:
+        return self.size / getattr(self, phase)
+
+
+def _time(function: Callable[[], T], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def measure(sources: Sequence[str], repeat: int = 5) -> PhaseTimings:
+    """
+    Times each phase over all of `sources`. Phases are timed separately, each
+    on the output of the previous phase, so none of them skews the others.
+    """
+    trees = [cst.parse_module(source) for source in sources]
+    # the names the tool's pre-scan finds, which let the transformer prune
+    hints = [find_trigger_names(source.encode()) for source in sources]
+
+    def visit() -> List[cst.Module]:
+        return [
+            tree.visit(TornadoAsyncTransformer(hint))
+            for tree, hint in zip(trees, hints)
+        ]
+
+    visited_trees = visit()
+
+    return PhaseTimings(
+        files=len(sources),
+        size=sum(len(source.encode()) for source in sources),
+        parse=_time(lambda: [cst.parse_module(source) for source in sources], repeat),
+        visit=_time(visit, repeat),
+        codegen=_time(lambda: [tree.code for tree in visited_trees], repeat),
+    )
+
+
+def _print_row(label: str, timings: PhaseTimings) -> None:
+    print(
+        "{:<28} {:>8} ".format(label, timings.size)
+        + " ".join(
+            "{:>11.1f} {:>9.0f}".format(
+                timings.files_per_second(phase), timings.bytes_per_second(phase) / 1024
+            )
+            for phase in ("parse", "visit", "codegen")
+        )
+    )
+
+
+def _print_header(title: str) -> None:
+    print()
+    print(title)
+    print(
+        "{:<28} {:>8} ".format("", "bytes")
+        + " ".join(
+            "{:>11} {:>9}".format(phase + " f/s", "KiB/s")
+            for phase in ("parse", "visit", "codegen")
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=10, help="Modules per corpus.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per phase.")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[0, 25, 100, 400],
+        help="Numbers of plain (non-coroutine) blocks per module to scale over.",
+    )
+    parser.add_argument(
+        "--coroutines",
+        type=int,
+        nargs="+",
+        default=[1, 10, 50, 200],
+        help="Numbers of coroutines per module to scale over.",
+    )
+    args = parser.parse_args()
+
+    _print_header("Scaling by file size (10 coroutines per module)")
+    for plain_blocks in args.sizes:
+        sources = [
+            generate_module(10, plain_blocks, seed=seed) for seed in range(args.files)
+        ]
+        _print_row(
+            "{} plain blocks".format(plain_blocks), measure(sources, args.repeat)
+        )
+
+    _print_header("Scaling by coroutine count (25 plain blocks per module)")
+    for coroutines in args.coroutines:
+        sources = [
+            generate_module(coroutines, 25, seed=seed) for seed in range(args.files)
+        ]
+        _print_row("{} coroutines".format(coroutines), measure(sources, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Generates synthetic tornado modules for benchmarking, mixing the patterns
+covered by tests/test_cases with plain, non-coroutine code.
+"""
+
+import random
+from typing import Callable, List
+
+COROUTINE_TEMPLATES = (
+    # a simple coroutine
+    """
+@gen.coroutine
+def call_api_{index}(client):
+    response = yield client.fetch("/api/{index}")
+    if response.status != 200:
+        raise BadStatusError()
+    raise gen.Return(response.data)
+""",
+    # gen.Return statement, gen.Return() and gen.Return(None)
+    """
+@gen.coroutine
+def check_id_valid_{index}(id: str):
+    response = yield fetch(id)
+    if response.status == 204:
+        raise gen.Return
+    if response.status == 404:
+        raise gen.Return(None)
+    if response.status != 200:
+        raise gen.Return()
+    raise gen.Return({{
+        'user': response.user,
+        'source': 'user-api-{index}'
+    }})
+""",
+    # yielding lists and list comprehensions of futures
+    """
+@gen.coroutine
+def fetch_users_{index}(user_ids):
+    first, second = yield [fetch(user_ids[0]), fetch(user_ids[1])]
+    users = yield [fetch(user_id) for user_id in user_ids]
+    raise gen.Return([first, second] + users)
+""",
+    # a coroutine with a nested coroutine and a nested generator
+    """
+@tornado.gen.coroutine
+def save_users_{index}(users):
+    def build_user_ids(users):
+        for user in users:
+            yield "{{}}-{{}}".format(user.first_name, user.last_name)
+
+    @gen.coroutine
+    def save(user_id):
+        response = yield fetch("POST", user_id)
+        raise gen.Return(response.status)
+
+    for user_id in build_user_ids(users):
+        yield save(user_id)
+""",
+    # gen.sleep
+    """
+@gen.coroutine
+def ping_{index}(retries={index}):
+    for _ in range(retries):
+        yield gen.sleep(0.1)
+    raise gen.Return("pong")
+""",
+)
+
+PLAIN_TEMPLATES = (
+    """
+def format_user_{index}(user, separator=", "):
+    parts = [user.first_name, user.last_name, str(user.id)]
+    return separator.join(part for part in parts if part)
+""",
+    """
+class UserRepository{index}(object):
+    table = "users_{index}"
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.cache = {{}}
+
+    def get(self, user_id):
+        if user_id not in self.cache:
+            self.cache[user_id] = self.connection.query(self.table, id=user_id)
+        return self.cache[user_id]
+""",
+    """
+SETTINGS_{index} = {{
+    "name": "service-{index}",
+    "timeouts": [1, 2, 3, 5, 8, 13],
+    "retry": {{"attempts": {index}, "backoff": 0.5}},
+    "hosts": ["host-{{}}".format(i) for i in range(10)],
+}}
+""",
+)
+
+HEADER = '''"""
+A synthetic module for benchmarking the tornado async transformer.
+"""
+import tornado
+from tornado import gen
+from util.http import fetch, BadStatusError
+'''
+
+
+def generate_module(coroutines: int, plain_blocks: int = 0, seed: int = 0) -> str:
+    """
+    Generates a module containing `coroutines` coroutines and `plain_blocks`
+    non-coroutine functions, classes and data literals, shuffled deterministically
+    by `seed`.
+    """
+    rng = random.Random(seed)
+    blocks: List[Callable[[int], str]] = [
+        COROUTINE_TEMPLATES[index % len(COROUTINE_TEMPLATES)].format
+        for index in range(coroutines)
+    ] + [
+        PLAIN_TEMPLATES[index % len(PLAIN_TEMPLATES)].format
+        for index in range(plain_blocks)
+    ]
+    rng.shuffle(blocks)
+    return HEADER + "".join(
+        "\n" + block(index=index) for index, block in enumerate(blocks)
+    )
@@ -1,15 +1,21 @@
+import re
+
 from setuptools import find_packages, setup
 from distutils.core import setup
 
 with open("README.md", "r") as readme:
     long_description = readme.read()
 
+# read the version without importing the package, which requires libcst
+with open("tornado_async_transformer/__init__.py", "r") as init:
+    version = re.search(r'__version__ = "(.+)"', init.read()).group(1)
+
 setup(
     name="tornado-async-transformer",
-    version="0.2.0",
+    version=version,
     description="libcst transformer and codemod for updating tornado @gen.coroutine syntax to python3.5+ native async/await",
     url="https://github.com/zhammer/tornado-async-transformer",
-    packages=find_packages(exclude=["tests", "demo_site"]),
+    packages=find_packages(exclude=["tests", "benchmarks", "demo_site"]),
     package_data={"tornado_async_transformer": ["py.typed"]},
     install_requires=["libcst == 0.2.4"],
     author="Zach Hammer",
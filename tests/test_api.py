@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import pytest
+
+from tornado_async_transformer.api import transform_paths, transform_source
+from tornado_async_transformer.tool import Outcome
+from tornado_async_transformer.tornado_async_transformer import TornadoAsyncTransformer
+
+from tests.collector import collect_test_cases
+
+
+def test_transform_source_matches_test_cases() -> None:
+    for param in collect_test_cases():
+        test_case = param.values[0]
+        result = transform_source(test_case.before)
+        assert result.code == test_case.after
+        assert result.changed == (test_case.before != test_case.after)
+        assert result.error is None
+
+
+def test_transform_source_reports_errors() -> None:
+    unsupported = transform_source("@gen.coroutine\ndef f(): yield gen.Task(g)\n")
+    broken = transform_source("@gen.coroutine\ndef f(:\n")
+
+    assert unsupported.outcome is Outcome.TRANSFORM_FAILED
+    assert "gen.Task" in unsupported.error
+    assert broken.outcome is Outcome.PARSE_FAILED
+    assert broken.code == "@gen.coroutine\ndef f(:\n"
+
+
+def test_transform_source_reports_unexpected_errors_as_failed(
+    monkeypatch: "pytest.MonkeyPatch",
+) -> None:
+    def crash(*args: object) -> None:
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(TornadoAsyncTransformer, "leave_Module", crash)
+    result = transform_source("@gen.coroutine\ndef f(): yield g()\n")
+
+    assert result.outcome is Outcome.FAILED
+    assert result.error == "RuntimeError('boom')"
+
+
+def test_transform_source_resolving_imports() -> None:
+    source = "from tornado import gen as g\n@g.coroutine\ndef f(): yield h()\n"
+
+    assert not transform_source(source).changed
+    assert transform_source(source, resolve_imports=True).code == (
+        "from tornado import gen as g\nasync def f(): await h()\n"
+    )
+
+
+def test_transform_paths_yields_results_without_side_effects(tmp_path: Path) -> None:
+    package = tmp_path / "package"
+    package.mkdir()
+    (package / "changed.py").write_text("@gen.coroutine\ndef f(): yield g()\n")
+    (package / "plain.py").write_text("def f(): pass\n")
+    (tmp_path / "single.py").write_text("@gen.coroutine\ndef f(): yield h()\n")
+
+    results = list(
+        transform_paths(
+            [package, str(tmp_path / "single.py")],
+            jobs=2,
+            write=False,
+            diff=True,
+            keep_code=True,
+        )
+    )
+
+    assert [(Path(result.filename).name, result.outcome) for result in results] == [
+        ("changed.py", Outcome.CHANGED),
+        ("plain.py", Outcome.SKIPPED),
+        ("single.py", Outcome.CHANGED),
+    ]
+    assert results[0].code == "async def f(): await g()\n"
+    assert results[0].diff.startswith("diff --git a/")
+    assert results[0].timings.total > 0
+    assert results[1].code is None
+    assert (
+        package / "changed.py"
+    ).read_text() == "@gen.coroutine\ndef f(): yield g()\n"
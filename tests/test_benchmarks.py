@@ -0,0 +1,79 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import libcst
+
+from benchmarks.bench_gate import (
+    BASELINE,
+    MEMORY_THRESHOLD,
+    Measurement,
+    compare,
+    measure_peak_memory,
+    workloads,
+)
+from benchmarks.corpus import generate_module
+from tornado_async_transformer import TornadoAsyncTransformer
+
+
+def test_synthetic_modules_are_fully_transformed() -> None:
+    source = generate_module(coroutines=20, plain_blocks=10, seed=1)
+    transformer = TornadoAsyncTransformer()
+
+    transformed = libcst.parse_module(source).visit(transformer).code
+
+    assert transformer.modified
+    assert source.count("coroutine\n") == transformed.count("async def ") == 24
+    for legacy in ("@gen.coroutine", "gen.Return", "yield fetch", "gen.sleep"):
+        assert legacy not in transformed
+
+
+def test_synthetic_modules_are_deterministic() -> None:
+    assert generate_module(5, 5, seed=3) == generate_module(5, 5, seed=3)
+    assert generate_module(5, 5, seed=3) != generate_module(5, 5, seed=4)
+
+
+def test_gate_baseline_covers_every_workload() -> None:
+    with open(BASELINE) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    assert set(baseline["workloads"]) == set(workloads())
+    for measurement in baseline["workloads"].values():
+        Measurement(**measurement)
+
+
+def test_gate_allows_for_noise_in_peak_memory() -> None:
+    baseline = Measurement(
+        throughput=100.0, spread=0.5, peak_memory=1000, memory_spread=0.01
+    )
+
+    assert compare(baseline, baseline._replace(peak_memory=1120)) == []
+    assert compare(baseline, baseline._replace(peak_memory=1200)) == [
+        "peak memory grew 20.0% (allowed 12.8%)"
+    ]
+    noisy = baseline._replace(peak_memory=1200, memory_spread=0.1)
+    assert compare(baseline, noisy) == []
+
+
+def test_gate_peak_memory_is_stable_across_runs() -> None:
+    _, memory_spread = measure_peak_memory("test_cases", runs=2)
+
+    assert memory_spread < MEMORY_THRESHOLD
+
+
+def test_gate_refuses_a_baseline_from_another_environment(tmp_path: Path) -> None:
+    with open(BASELINE) as baseline_file:
+        baseline = json.load(baseline_file)
+    baseline["environment"]["libcst"] = "0.0.1"
+    (tmp_path / "baseline.json").write_text(json.dumps(baseline))
+
+    gate = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_gate"]
+        + ["--baseline", str(tmp_path / "baseline.json")],
+        cwd=str(Path(BASELINE).parent.parent),
+        stderr=subprocess.PIPE,
+    )
+
+    assert gate.returncode == 1
+    assert b"re-record the baseline" in gate.stderr
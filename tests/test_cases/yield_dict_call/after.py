@@ -0,0 +1,11 @@
+"""
+A coroutine that yields a dict of yieldable objects built with dict(), added in tornado 3.2.
+See: https://www.tornadoweb.org/en/branch3.2/releases/v3.2.0.html#tornado-gen.
+"""
+from tornado import gen
+import asyncio
+
+
+async def get_user_friends_and_relatives(user_id):
+    users = dict(zip(("friends", "relatives"), await asyncio.gather(fetch("/friends", user_id), fetch("/relatives", user_id))))
+    return users
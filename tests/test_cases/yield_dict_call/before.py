@@ -0,0 +1,13 @@
+"""
+A coroutine that yields a dict of yieldable objects built with dict(), added in tornado 3.2.
+See: https://www.tornadoweb.org/en/branch3.2/releases/v3.2.0.html#tornado-gen.
+"""
+from tornado import gen
+
+
+@gen.coroutine
+def get_user_friends_and_relatives(user_id):
+    users = yield dict(
+        friends=fetch("/friends", user_id), relatives=fetch("/relatives", user_id)
+    )
+    raise gen.Return(users)
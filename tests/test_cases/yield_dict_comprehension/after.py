@@ -0,0 +1,11 @@
+"""
+A coroutine that yields a dict comprehension that creates a dict of yieldable objects.
+See: https://www.tornadoweb.org/en/branch3.2/releases/v3.2.0.html#tornado-gen.
+"""
+from tornado import gen
+import asyncio
+
+
+async def get_users_by_id(user_ids):
+    users = {key: value for futures in [{user_id: fetch(user_ids) for user_id in user_ids}] for key, value in zip(futures, await asyncio.gather(*futures.values()))}
+    return users
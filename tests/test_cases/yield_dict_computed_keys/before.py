@@ -0,0 +1,12 @@
+"""
+A coroutine that yields a dict of yieldable objects whose keys aren't just names or literals,
+which have to be evaluated in order along with the yieldable objects.
+See: https://www.tornadoweb.org/en/branch3.2/releases/v3.2.0.html#tornado-gen.
+"""
+from tornado import gen
+
+
+@gen.coroutine
+def get_user_and_defaults(user_id, defaults):
+    users = yield {"user-" + str(user_id): fetch(user_id), **defaults}
+    raise gen.Return(users)
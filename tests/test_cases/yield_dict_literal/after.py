@@ -0,0 +1,11 @@
+"""
+A coroutine that yields a dict of yieldable objects, added in tornado 3.2.
+See: https://www.tornadoweb.org/en/branch3.2/releases/v3.2.0.html#tornado-gen.
+"""
+from tornado import gen
+import asyncio
+
+
+async def get_two_users_by_id(user_id_1, user_id_2):
+    users = dict(zip((user_id_1, user_id_2), await asyncio.gather(fetch(user_id_1), fetch(user_id_2))))
+    return users
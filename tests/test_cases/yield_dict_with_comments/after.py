@@ -0,0 +1,14 @@
+"""
+A coroutine that yields a dict of yieldable objects with comments in it, which
+are kept by gathering the dict's values rather than splitting it up.
+"""
+from tornado import gen
+import asyncio
+
+
+async def get_two_users_by_id(user_id_1, user_id_2):
+    users = {key: value for futures in [{
+        user_id_1: fetch(user_id_1),  # the one who asked
+        user_id_2: fetch(user_id_2),
+    }] for key, value in zip(futures, await asyncio.gather(*futures.values()))}
+    return users
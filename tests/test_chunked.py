@@ -0,0 +1,155 @@
+from pathlib import Path
+from typing import Callable
+
+import libcst
+import pytest
+
+from benchmarks.corpus import generate_module
+from tornado_async_transformer import TornadoAsyncTransformer, TransformError
+from tornado_async_transformer.chunked import ChunkedModule, split_into_chunks
+from tornado_async_transformer.tool import Outcome, find_trigger_names, transform_file
+
+from tests.collector import TestCase, collect_test_cases
+
+MIXED_MODULE = """#!/usr/bin/env python
+\"\"\"A module with a bit of everything at the top level.\"\"\"
+import os; import sys
+from tornado import gen
+
+x = 1; y = 2
+
+
+# a comment about f
+@gen.coroutine  # trailing comment
+# a comment between decorators
+@other.decorator
+def f():
+    yield [g(), h()]
+
+
+class Handler(object):
+    @gen.coroutine
+    def get(self):
+        value = yield gen.sleep(1)
+        raise gen.Return(value)
+
+if __name__ == "__main__":
+    pass"""
+
+
+def transform_in_chunks(source: str) -> str:
+    transformer = TornadoAsyncTransformer(
+        possible_trigger_names=find_trigger_names(source.encode())
+    )
+    return ChunkedModule.parse(source).visit(transformer).code
+
+
+def transform_whole(source: str) -> str:
+    return libcst.parse_module(source).visit(TornadoAsyncTransformer()).code
+
+
+@pytest.mark.parametrize("test_case", collect_test_cases())
+def test_chunked_python_module(test_case: TestCase) -> None:
+    assert transform_in_chunks(test_case.before) == test_case.after
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_chunked_matches_whole_module(newline: str) -> None:
+    for source in (
+        MIXED_MODULE,
+        "import asyncio\n" + generate_module(coroutines=10, plain_blocks=20, seed=2),
+    ):
+        source = source.replace("\n", newline)
+        assert transform_in_chunks(source) == transform_whole(source)
+
+
+def test_chunks_splice_back_exactly() -> None:
+    chunks = split_into_chunks(MIXED_MODULE)
+
+    assert "".join(chunk.source for chunk in chunks) == MIXED_MODULE
+    assert [chunk.is_import for chunk in chunks] == [
+        False,
+        True,
+        True,
+        False,
+        False,
+        False,
+        False,
+    ]
+    # comments and blank lines go with the statement after them, like in libcst
+    assert chunks[4].source.startswith(
+        "\n\n# a comment about f\n@gen.coroutine  # trailing comment\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "between",
+    ["  # c\n", "\t\n", "  \n", "\x0c\n", " \x0c# c\n", "\\\n"],
+    ids=[
+        "indented comment",
+        "tab",
+        "spaces",
+        "form feed",
+        "form feed comment",
+        "backslash",
+    ],
+)
+@pytest.mark.parametrize(
+    "after", ["", "y = 1\n", "@gen.coroutine\ndef h(): yield g()\n"]
+)
+def test_chunked_keeps_lines_after_a_coroutine(between: str, after: str) -> None:
+    source = "from tornado import gen\n@gen.coroutine\ndef f():\n    yield g()\n"
+    source += between + after
+
+    def outcome(transform: Callable[[str], str]) -> str:
+        # some versions of libcst can't parse a lone backslash continuation
+        # line at all, which chunking mustn't change either
+        try:
+            return transform(source)
+        except libcst.ParserSyntaxError:
+            return "failed parse"
+
+    assert outcome(transform_in_chunks) == outcome(transform_whole)
+
+
+def test_statements_sharing_a_line_share_a_chunk() -> None:
+    source = "x = (1,\n2); y = gen.Task(f)\nz = 3\n"
+
+    assert [chunk.source for chunk in split_into_chunks(source)] == [
+        "x = (1,\n2); y = gen.Task(f)\n",
+        "z = 3\n",
+    ]
+    with pytest.raises(TransformError):
+        transform_in_chunks(source)
+
+
+def test_required_imports_already_in_another_chunk_are_not_added() -> None:
+    source = (
+        "import os\nimport asyncio\nfrom tornado import gen\n"
+        "@gen.coroutine\ndef f():\n    yield gen.sleep(1)\n"
+    )
+
+    assert transform_in_chunks(source) == transform_whole(source)
+    assert transform_in_chunks(source).count("import asyncio") == 1
+
+
+def test_only_candidate_chunks_are_parsed() -> None:
+    module = ChunkedModule.parse(MIXED_MODULE)
+
+    # the coroutines, but not the imports: asyncio isn't needed until visiting
+    assert sorted(module.modules) == [4, 5]
+
+
+def test_transform_file_in_chunks(tmp_path: Path) -> None:
+    source = "from tornado import gen\n" + generate_module(5, plain_blocks=5, seed=3)
+    (tmp_path / "large.py").write_text(source)
+    (tmp_path / "small.py").write_text(source)
+
+    for name, chunk_lines in (("large.py", 10), ("small.py", 100000)):
+        result = transform_file(
+            TornadoAsyncTransformer(), str(tmp_path / name), chunk_lines=chunk_lines
+        )
+        assert result.outcome is Outcome.CHANGED
+
+    assert (tmp_path / "large.py").read_text() == transform_whole(source)
+    assert (tmp_path / "small.py").read_text() == transform_whole(source)
@@ -0,0 +1,147 @@
+from pathlib import Path
+
+import libcst
+import pytest
+
+from tornado_async_transformer import TornadoAsyncTransformer
+from tornado_async_transformer.composite import CompositeTransformer
+from tornado_async_transformer.helpers import with_added_imports
+from tornado_async_transformer.import_aware import ImportAwareTornadoAsyncTransformer
+from tornado_async_transformer.tool import Outcome, transform_file
+
+from tests.collector import TestCase, collect_test_cases
+
+
+class PrintToLogging(libcst.CSTTransformer):
+    """
+    A stand-in for another codemod: replaces print() with logging.info(),
+    adding `import logging` and `import asyncio` to modules it changes.
+    """
+
+    def __init__(self) -> None:
+        self.replaced = False
+
+    def leave_Call(
+        self, node: libcst.Call, updated_node: libcst.Call
+    ) -> libcst.BaseExpression:
+        if not libcst.matchers.matches(node.func, libcst.matchers.Name("print")):
+            return updated_node
+
+        self.replaced = True
+        return updated_node.with_changes(
+            func=libcst.Attribute(
+                value=libcst.Name("logging"), attr=libcst.Name("info")
+            )
+        )
+
+    def leave_Module(
+        self, node: libcst.Module, updated_node: libcst.Module
+    ) -> libcst.Module:
+        if not self.replaced:
+            return updated_node
+
+        imports = [
+            libcst.Import(names=[libcst.ImportAlias(name=libcst.Name(name))])
+            for name in ("asyncio", "logging")
+        ]
+        return with_added_imports(updated_node, imports)
+
+
+class SkipFunctions(libcst.CSTTransformer):
+    """
+    Records the names it sees, skipping the insides of functions.
+    """
+
+    def __init__(self) -> None:
+        self.names = []
+
+    def visit_FunctionDef(self, node: libcst.FunctionDef) -> bool:
+        return False
+
+    def visit_Name(self, node: libcst.Name) -> None:
+        self.names.append(node.value)
+
+
+@pytest.mark.parametrize("test_case", collect_test_cases())
+def test_composite_matches_running_transformers_one_after_another(
+    test_case: TestCase,
+) -> None:
+    source_tree = libcst.parse_module(test_case.before)
+    one_after_another = source_tree.visit(TornadoAsyncTransformer()).visit(
+        PrintToLogging()
+    )
+
+    composite = CompositeTransformer([TornadoAsyncTransformer(), PrintToLogging()])
+
+    assert source_tree.visit(composite).code == one_after_another.code
+
+
+def test_composite_merges_required_imports() -> None:
+    before = """import os
+from tornado import gen
+
+
+@gen.coroutine
+def f():
+    print("sleeping")
+    yield [gen.sleep(1), gen.sleep(2)]
+"""
+    after = """import os
+import logging
+import asyncio
+from tornado import gen
+
+
+async def f():
+    logging.info("sleeping")
+    await asyncio.gather(*[asyncio.sleep(1), asyncio.sleep(2)])
+"""
+    composite = CompositeTransformer([TornadoAsyncTransformer(), PrintToLogging()])
+
+    assert libcst.parse_module(before).visit(composite).code == after
+
+
+def test_composite_only_skips_children_for_the_transformer_that_asked() -> None:
+    skip_functions = SkipFunctions()
+    composite = CompositeTransformer([skip_functions, TornadoAsyncTransformer()])
+    source = "from tornado import gen\n@gen.coroutine\ndef f(): yield g()\nh()\n"
+
+    visited_tree = libcst.parse_module(source).visit(composite)
+
+    assert (
+        visited_tree.code == "from tornado import gen\nasync def f(): await g()\nh()\n"
+    )
+    assert "g" not in skip_functions.names
+    assert "h" in skip_functions.names
+
+
+def test_composite_resolves_metadata_for_its_transformers(tmp_path: Path) -> None:
+    filename = tmp_path / "renamed.py"
+    filename.write_text(
+        "from tornado import gen as g\nprint(1)\n@g.coroutine\ndef f(): yield h()\n"
+    )
+    composite = CompositeTransformer(
+        [ImportAwareTornadoAsyncTransformer(), PrintToLogging()]
+    )
+
+    result = transform_file(composite, str(filename))
+
+    assert result.outcome is Outcome.CHANGED
+    assert filename.read_text() == (
+        "from tornado import gen as g\n"
+        "import asyncio\n"
+        "import logging\n"
+        "logging.info(1)\n"
+        "async def f(): await h()\n"
+    )
+
+
+def test_composite_transforms_files_the_pre_scan_would_skip(tmp_path: Path) -> None:
+    filename = tmp_path / "plain.py"
+    filename.write_text("import os\nprint(os.getcwd())\n")
+    composite = CompositeTransformer([TornadoAsyncTransformer(), PrintToLogging()])
+
+    result = transform_file(composite, str(filename))
+
+    assert result.outcome is Outcome.CHANGED
+    assert "logging.info(os.getcwd())" in filename.read_text()
@@ -0,0 +1,124 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tornado_async_transformer.discovery import GitError, collect_files, git_files
+
+
+def make_tree(root: Path, paths: list) -> None:
+    for path in paths:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text("")
+
+
+def relative_files(root: Path, **kwargs) -> list:
+    return [
+        str(Path(path).relative_to(root)) for path in collect_files(str(root), **kwargs)
+    ]
+
+
+def test_collect_files_prunes_default_excludes_and_virtualenvs(tmp_path: Path) -> None:
+    make_tree(
+        tmp_path,
+        [
+            "app/handlers.py",
+            "app/stubs.pyi",
+            "app/README.md",
+            "main.py",
+            "node_modules/package/setup.py",
+            ".git/hooks/pre-commit.py",
+            "env/pyvenv.cfg",
+            "env/lib/python3.7/site-packages/tornado/gen.py",
+        ],
+    )
+
+    assert relative_files(tmp_path) == ["main.py", "app/handlers.py", "app/stubs.pyi"]
+
+
+def test_collect_files_exclude_globs(tmp_path: Path) -> None:
+    make_tree(tmp_path, ["app/handlers.py", "app/generated/models.py", "build/app.py"])
+
+    assert relative_files(tmp_path, exclude=["build", "app/gen*"]) == [
+        "app/handlers.py"
+    ]
+
+
+def test_collect_files_respects_gitignore(tmp_path: Path) -> None:
+    make_tree(
+        tmp_path,
+        [
+            "app/handlers.py",
+            "app/migrations/0001.py",
+            "app/migrations/keep.py",
+            "build/app.py",
+            "docs/conf.py",
+            "scratch.py",
+        ],
+    )
+    (tmp_path / ".gitignore").write_text("# build output\n/build/\nscratch.py\n")
+    (tmp_path / "app" / ".gitignore").write_text("migrations/*\n!migrations/keep.py\n")
+
+    assert relative_files(tmp_path) == [
+        "app/handlers.py",
+        "app/migrations/keep.py",
+        "docs/conf.py",
+    ]
+    assert len(relative_files(tmp_path, use_gitignore=False)) == 6
+
+
+def git(root: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=str(root),
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def test_git_files_lists_tracked_and_changed_files(
+    tmp_path: Path, monkeypatch: "pytest.MonkeyPatch"
+) -> None:
+    make_tree(
+        tmp_path,
+        ["app/handlers.py", "app/models.py", "app/README.md", "vendor/lib.py"],
+    )
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "initial")
+    (tmp_path / "app" / "models.py").write_text("changed = True\n")
+    (tmp_path / "app" / "handlers.py").unlink()
+    make_tree(tmp_path, ["build/generated.py", "app/new.py"])
+    monkeypatch.chdir(tmp_path / "app")
+
+    assert list(git_files(["."])) == ["models.py"]
+    monkeypatch.chdir(tmp_path)
+    assert list(git_files(["."])) == ["app/models.py", "vendor/lib.py"]
+    assert list(git_files(["."], exclude=["vendor"])) == ["app/models.py"]
+    assert list(git_files(["app"], since="HEAD")) == ["app/models.py"]
+
+    with pytest.raises(GitError):
+        list(git_files(["."], since="no-such-revision"))
+
+
+def test_git_files_since_leaves_out_upstream_changes(
+    tmp_path: Path, monkeypatch: "pytest.MonkeyPatch"
+) -> None:
+    make_tree(tmp_path, ["app/handlers.py", "app/models.py", "app/views.py"])
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "initial")
+    git(tmp_path, "branch", "upstream")
+    (tmp_path / "app" / "models.py").write_text("committed = True\n")
+    git(tmp_path, "commit", "-q", "-am", "on the branch")
+    git(tmp_path, "checkout", "-q", "upstream")
+    (tmp_path / "app" / "handlers.py").write_text("upstream = True\n")
+    git(tmp_path, "commit", "-q", "-am", "upstream")
+    git(tmp_path, "checkout", "-q", "-")
+    (tmp_path / "app" / "views.py").write_text("uncommitted = True\n")
+    monkeypatch.chdir(tmp_path)
+
+    assert sorted(git_files(["."], since="upstream")) == [
+        "app/models.py",
+        "app/views.py",
+    ]
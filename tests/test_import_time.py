@@ -0,0 +1,12 @@
+from benchmarks.bench_import import best_import_time
+
+# importing libcst and building the matchers alone takes about half a second
+IMPORT_TIME_BUDGET_US = 300 * 1000
+
+
+def test_tool_and_api_import_without_libcst() -> None:
+    for module in ("tornado_async_transformer.tool", "tornado_async_transformer.api"):
+        times = best_import_time(module, repeat=3)
+
+        assert not [name for name in times if name.split(".")[0] == "libcst"]
+        assert times[module].cumulative < IMPORT_TIME_BUDGET_US
@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+
+from tornado_async_transformer.journal import Journal
+
+
+def test_journal_skips_recorded_files_on_resume(tmp_path: Path) -> None:
+    path = str(tmp_path / "journal")
+    journal = Journal(path, sync_every=2)
+    journal.record("./app/a.py", "CHANGED")
+    journal.record("app/b.py", "TRANSFORM_FAILED", "gen.Task is unsupported")
+    journal.close()
+
+    resumed = Journal(path)
+    pending = list(resumed.pending(["app/a.py", "app/b.py", "app/c.py"]))
+    resumed.close()
+
+    assert pending == ["app/c.py"]
+    assert resumed.skipped == 2
+    assert json.loads(Path(path).read_text().splitlines()[1]) == {
+        "filename": "app/b.py",
+        "outcome": "TRANSFORM_FAILED",
+        "error": "gen.Task is unsupported",
+    }
+
+
+def test_journal_retries_files_that_failed_for_lack_of_resources(
+    tmp_path: Path,
+) -> None:
+    path = str(tmp_path / "journal")
+    journal = Journal(path)
+    journal.record("a.py", "OVER_BUDGET", "went over the time budget")
+    journal.record("b.py", "FAILED", "worker died")
+    journal.record("c.py", "FAILED", "worker died")
+    journal.record("c.py", "UNCHANGED")
+    journal.close()
+
+    resumed = Journal(path)
+    pending = list(resumed.pending(["a.py", "b.py", "c.py"]))
+    resumed.close()
+
+    assert pending == ["a.py", "b.py"]
+    assert resumed.skipped == 1
+
+
+def test_journal_ignores_a_line_cut_short(tmp_path: Path) -> None:
+    path = tmp_path / "journal"
+    path.write_text('{"filename": "a.py", "outcome": "CHANGED"}\n{"filename": "b.p')
+
+    journal = Journal(str(path))
+    journal.record("c.py", "UNCHANGED")
+    journal.close()
+
+    resumed = Journal(str(path))
+    resumed.close()
+    assert resumed.done == {"a.py": "CHANGED", "c.py": "UNCHANGED"}
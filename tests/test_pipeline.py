@@ -0,0 +1,77 @@
+import tracemalloc
+from pathlib import Path
+from typing import Iterator
+
+from benchmarks.corpus import generate_module
+from tornado_async_transformer.pipeline import Pipeline, SourceFile
+from tornado_async_transformer.tool import Outcome, transform_files
+
+
+def sizes(source_files: Iterator[SourceFile]) -> Iterator[int]:
+    for source_file in source_files:
+        assert source_file.source is not None
+        yield len(source_file.source)
+
+
+def test_pipeline_keeps_order_within_its_budget(tmp_path: Path) -> None:
+    filenames = []
+    for index in range(50):
+        filename = tmp_path / "{}.py".format(index)
+        filename.write_bytes(b"x" * (index + 1) * 10)
+        filenames.append(str(filename))
+
+    pipeline = Pipeline(filenames, sizes, lambda size: size * 2, 1000, queue_size=4)
+
+    assert list(pipeline) == [(index + 1) * 20 for index in range(50)]
+    assert 0 < pipeline.budget.peak <= 1000
+
+
+def test_pipeline_lets_files_bigger_than_its_budget_through(tmp_path: Path) -> None:
+    (tmp_path / "big.py").write_bytes(b"x" * 5000)
+
+    pipeline = Pipeline(
+        [str(tmp_path / "big.py"), str(tmp_path / "missing.py")],
+        lambda source_files: (source_file.source for source_file in source_files),
+        lambda source: source,
+        1000,
+    )
+
+    assert [None if source is None else len(source) for source in pipeline] == [
+        5000,
+        None,
+    ]
+
+
+def test_transform_files_stops_when_abandoned(tmp_path: Path) -> None:
+    filenames = []
+    for index in range(20):
+        filename = tmp_path / "{}.py".format(index)
+        filename.write_text(generate_module(5, seed=index))
+        filenames.append(str(filename))
+
+    results = transform_files(filenames, jobs=2, write=False, max_bytes_in_flight=1)
+    assert next(results).outcome is Outcome.CHANGED
+    results.close()
+
+
+def test_peak_memory_stays_flat_on_a_large_tree(tmp_path: Path) -> None:
+    plain = generate_module(0, plain_blocks=1100)
+    coroutines = generate_module(10)
+    filenames = []
+    for index in range(60):
+        filename = tmp_path / "{}.py".format(index)
+        filename.write_text(coroutines if index % 20 == 0 else plain)
+        filenames.append(str(filename))
+    tree_size = sum(Path(filename).stat().st_size for filename in filenames)
+
+    tracemalloc.start()
+    try:
+        results = list(transform_files(filenames, max_bytes_in_flight=1024 * 1024))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert [result.outcome for result in results].count(Outcome.CHANGED) == 3
+    assert tree_size > 10 * 1024 * 1024
+    # the cap, the file being transformed and the pipeline's own bookkeeping
+    assert peak < 4 * 1024 * 1024
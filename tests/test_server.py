@@ -0,0 +1,111 @@
+import json
+import signal
+import threading
+from http.client import HTTPConnection
+from typing import Any, Dict, Iterator, Tuple
+
+import pytest
+
+from benchmarks.corpus import generate_module
+from tornado_async_transformer.server import (
+    ThreadingHTTPServer,
+    TransformService,
+    make_handler,
+    transform_source_with_limit,
+)
+
+from tests.collector import collect_test_cases
+
+
+@pytest.fixture(scope="module")
+def server() -> Iterator[Tuple[str, int]]:
+    service = TransformService(workers=1, cache_size=16, cpu_time_limit=10.0)
+    http_server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), make_handler(service, max_request_bytes=64 * 1024)
+    )
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield http_server.server_address
+    http_server.shutdown()
+    http_server.server_close()
+    service.shutdown()
+
+
+def post(address: Tuple[str, int], body: bytes) -> Tuple[int, Dict[str, Any]]:
+    connection = HTTPConnection(*address)
+    connection.request("POST", "/transform", body=body)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_transform_endpoint(server: Tuple[str, int]) -> None:
+    test_case = collect_test_cases()[0].values[0]
+    body = json.dumps({"source": test_case.before}).encode()
+
+    status, response = post(server, body)
+    cached_status, cached_response = post(server, body)
+
+    assert status == cached_status == 200
+    assert response == cached_response
+    assert response == {"source": test_case.after, "changed": True, "error": None}
+
+
+def test_transform_endpoint_reports_errors(server: Tuple[str, int]) -> None:
+    status, response = post(
+        server, json.dumps({"source": "yield gen.Task(f)"}).encode()
+    )
+
+    assert status == 200
+    assert response["error"]["type"] == "TransformError"
+
+
+def test_transform_endpoint_rejects_large_requests(server: Tuple[str, int]) -> None:
+    status, response = post(server, json.dumps({"source": "x" * 65 * 1024}).encode())
+
+    assert status == 413
+
+
+def test_cpu_time_limit() -> None:
+    source = generate_module(coroutines=200, plain_blocks=200)
+    handler = signal.getsignal(signal.SIGPROF)
+
+    response = transform_source_with_limit(source, cpu_time_limit=0.01)
+
+    assert response["error"]["type"] == "CPUTimeLimitExceeded"
+    assert response["source"] == source
+    assert signal.getsignal(signal.SIGPROF) == handler
+
+
+def test_errors_are_not_cached() -> None:
+    source = generate_module(coroutines=200, plain_blocks=200)
+    service = TransformService(workers=1, cache_size=16, cpu_time_limit=0.01)
+    try:
+        response = service.transform(source)
+    finally:
+        service.shutdown()
+
+    assert response["error"]["type"] == "CPUTimeLimitExceeded"
+    assert service.cache.get(service.cache.key(source)) is None
+
+
+def test_batch_endpoint_streams_results(server: Tuple[str, int]) -> None:
+    test_cases = [param.values[0] for param in collect_test_cases()]
+    records = [
+        json.dumps({"id": index, "source": test_case.before}).encode() + b"\n"
+        for index, test_case in enumerate(test_cases)
+    ] + [b"not json\n", b'{"id": "no-source"}\n']
+
+    connection = HTTPConnection(*server)
+    connection.request("POST", "/batch", body=iter(records), encode_chunked=True)
+    response = connection.getresponse()
+    results = [json.loads(line) for line in response.read().splitlines()]
+
+    assert response.status == 200
+    assert len(results) == len(records)
+    by_id = {result["id"]: result for result in results}
+    for index, test_case in enumerate(test_cases):
+        assert by_id[index]["source"] == test_case.after
+        assert by_id[index]["changed"] == (test_case.before != test_case.after)
+        assert by_id[index]["error"] is None
+    assert by_id[None]["error"]["type"] == "InvalidRecord"
+    assert by_id["no-source"]["error"]["type"] == "InvalidRecord"
@@ -0,0 +1,53 @@
+import os
+import time
+
+import pytest
+
+from tornado_async_transformer.supervisor import (
+    WorkerFailure,
+    rss_supported,
+    supervised_map,
+)
+
+
+def misbehave(item: str) -> str:
+    if item == "slow":
+        time.sleep(60)
+    elif item == "hungry":
+        hoard = []
+        while True:
+            hoard.append(bytearray(16 * 1024 * 1024))
+            time.sleep(0.01)
+    elif item == "crash":
+        os._exit(3)
+    return item.upper()
+
+
+def test_supervised_map_keeps_order_and_replaces_slow_workers() -> None:
+    start = time.monotonic()
+    results = list(
+        supervised_map(misbehave, ["a", "slow", "b", "crash", "c"], jobs=2, timeout=1)
+    )
+
+    assert results == [
+        "A",
+        WorkerFailure("slow", "took longer than 1s", over_budget=True),
+        "B",
+        WorkerFailure("crash", "worker died with exit code 3", over_budget=False),
+        "C",
+    ]
+    assert time.monotonic() - start < 10
+
+
+@pytest.mark.skipif(not rss_supported(), reason="rss is read from /proc")
+def test_supervised_map_replaces_workers_over_memory_budget() -> None:
+    results = list(
+        supervised_map(
+            misbehave, ["hungry", "a"], jobs=1, timeout=30, max_rss=512 * 1024 * 1024
+        )
+    )
+
+    assert results == [
+        WorkerFailure("hungry", "used more than 512 MiB of memory", over_budget=True),
+        "A",
+    ]
@@ -0,0 +1,188 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from benchmarks.corpus import generate_module
+from tornado_async_transformer import cache as cache_module
+from tornado_async_transformer.cache import CacheEntry, ResultCache
+from tornado_async_transformer.report import build_report
+from tornado_async_transformer.tool import Outcome, transform_files
+
+from tests.collector import collect_test_cases
+
+
+def write_test_cases(directory: Path) -> list:
+    test_cases = [param.values[0] for param in collect_test_cases()]
+    for index, test_case in enumerate(test_cases):
+        (directory / "case_{}.py".format(index)).write_text(test_case.before)
+    return test_cases
+
+
+def test_transform_files_in_parallel_keeps_order(tmp_path: Path) -> None:
+    test_cases = write_test_cases(tmp_path)
+    (tmp_path / "broken.py").write_text("@gen.coroutine\ndef broken(:\n")
+    filenames = [str(tmp_path / "case_{}.py".format(i)) for i in range(len(test_cases))]
+    filenames.insert(1, str(tmp_path / "broken.py"))
+
+    results = list(transform_files(filenames, jobs=2))
+
+    assert [result.filename for result in results] == filenames
+    assert results[1].outcome is Outcome.PARSE_FAILED
+    for index, test_case in enumerate(test_cases):
+        assert (tmp_path / "case_{}.py".format(index)).read_text() == test_case.after
+
+
+def test_pre_scan_skips_files_without_trigger_names(tmp_path: Path) -> None:
+    test_cases = write_test_cases(tmp_path)
+    filenames = [str(tmp_path / "case_{}.py".format(i)) for i in range(len(test_cases))]
+
+    results = list(transform_files(filenames))
+
+    for result, test_case in zip(results, test_cases):
+        if test_case.before == test_case.after:
+            assert result.outcome in (Outcome.SKIPPED, Outcome.UNCHANGED)
+        else:
+            assert result.outcome is Outcome.CHANGED
+
+    assert Outcome.SKIPPED in {result.outcome for result in results}
+
+
+def test_cache_remembers_unchanged_and_unsupported_files(tmp_path: Path) -> None:
+    (tmp_path / "unchanged.py").write_text("@gen_test\nasync def test(): pass\n")
+    (tmp_path / "unsupported.py").write_text("yield gen.Task(f)\n")
+    filenames = [str(tmp_path / "unchanged.py"), str(tmp_path / "unsupported.py")]
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    first_run = list(transform_files(filenames, jobs=2, cache=cache))
+    second_run = list(transform_files(filenames, jobs=2, cache=cache))
+
+    assert [result.outcome for result in first_run] == [
+        Outcome.UNCHANGED,
+        Outcome.TRANSFORM_FAILED,
+    ]
+    assert [(result.outcome, result.error) for result in second_run] == [
+        (result.outcome, result.error) for result in first_run
+    ]
+    assert all(result.cached for result in second_run)
+
+
+def test_cache_is_invalidated_by_changes_to_the_transformer(
+    tmp_path: Path, monkeypatch: "pytest.MonkeyPatch"
+) -> None:
+    source = b"@gen.coroutine\ndef f(): yield {a: g()}\n"
+    with monkeypatch.context() as patch:
+        patch.setattr(cache_module, "transformer_fingerprint", lambda: "older")
+        ResultCache(str(tmp_path)).put(
+            source, CacheEntry(Outcome.TRANSFORM_FAILED.name, "unsupported")
+        )
+
+    assert ResultCache(str(tmp_path)).get(source) is None
+
+
+def test_resolve_imports_handles_renamed_imports(tmp_path: Path) -> None:
+    source = "from tornado.gen import coroutine as co\n@co\ndef f(): yield g()\n"
+    (tmp_path / "renamed.py").write_text(source)
+    filename = str(tmp_path / "renamed.py")
+
+    assert list(transform_files([filename]))[0].outcome is Outcome.UNCHANGED
+    result = list(transform_files([filename], resolve_imports=True))[0]
+
+    assert result.outcome is Outcome.CHANGED
+    assert "async def f(): await g()" in (tmp_path / "renamed.py").read_text()
+
+
+def test_files_over_budget_are_skipped(tmp_path: Path) -> None:
+    (tmp_path / "large.py").write_text(generate_module(coroutines=3000, seed=1))
+    (tmp_path / "small.py").write_text("@gen.coroutine\ndef f(): yield g()\n")
+    filenames = [str(tmp_path / "large.py"), str(tmp_path / "small.py")]
+
+    results = list(transform_files(filenames, jobs=2, file_timeout=1))
+
+    assert [(result.outcome, result.error) for result in results] == [
+        (Outcome.OVER_BUDGET, "took longer than 1s"),
+        (Outcome.CHANGED, None),
+    ]
+    assert (tmp_path / "large.py").read_text() == generate_module(3000, seed=1)
+
+
+def test_report_has_phase_timings_percentiles_and_slowest_files(tmp_path: Path) -> None:
+    test_cases = write_test_cases(tmp_path)
+    filenames = [str(tmp_path / "case_{}.py".format(i)) for i in range(len(test_cases))]
+    results = list(transform_files(filenames))
+
+    report = build_report(results, wall_time=1.0, top=3)
+
+    assert report["summary"]["files"] == len(filenames)
+    assert report["summary"]["bytes"] == sum(
+        len(test_case.before.encode()) for test_case in test_cases
+    )
+    assert set(report["percentiles"]) == {
+        "read",
+        "parse",
+        "transform",
+        "codegen",
+        "write",
+        "total",
+    }
+    slowest_totals = [entry["timings"]["total"] for entry in report["slowest"]]
+    assert len(slowest_totals) == 3
+    assert slowest_totals == sorted(slowest_totals, reverse=True)
+    assert slowest_totals[0] == report["percentiles"]["total"]["max"]
+
+
+def test_diff_mode_leaves_files_untouched(tmp_path: Path) -> None:
+    test_cases = write_test_cases(tmp_path)
+    filenames = [str(tmp_path / "case_{}.py".format(i)) for i in range(len(test_cases))]
+
+    results = list(transform_files(filenames, jobs=2, write=False, diff=True))
+
+    for result, test_case in zip(results, test_cases):
+        assert Path(result.filename).read_text() == test_case.before
+        if test_case.before == test_case.after:
+            assert result.diff is None
+        else:
+            assert result.diff.startswith("diff --git a/")
+            assert "async def " in result.diff
+
+
+def test_patches_apply_from_the_repository_root(
+    tmp_path: Path, monkeypatch: "pytest.MonkeyPatch"
+) -> None:
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "handlers.py").write_text(
+        "@gen.coroutine\ndef f(): yield g()\n"
+    )
+    subprocess.run(["git", "init", "-q"], cwd=str(tmp_path), check=True)
+    monkeypatch.chdir(tmp_path / "app")
+
+    [result] = transform_files(["handlers.py"], write=False, diff=True)
+    (tmp_path / "changes.patch").write_text(result.diff)
+    subprocess.run(["git", "apply", "changes.patch"], cwd=str(tmp_path), check=True)
+
+    assert result.diff.startswith("diff --git a/app/handlers.py b/app/handlers.py")
+    assert (
+        tmp_path / "app" / "handlers.py"
+    ).read_text() == "async def f(): await g()\n"
+
+
+def test_check_mode_only_reports(tmp_path: Path) -> None:
+    test_cases = write_test_cases(tmp_path)
+    filenames = [str(tmp_path / "case_{}.py".format(i)) for i in range(len(test_cases))]
+
+    results = list(transform_files(filenames, jobs=2, write=False, check=True))
+
+    for result, test_case in zip(results, test_cases):
+        assert Path(result.filename).read_text() == test_case.before
+        assert result.changed == (test_case.before != test_case.after)
+        assert result.timings.codegen == 0.0
+
+
+def test_check_mode_finds_gen_task_after_the_first_coroutine(tmp_path: Path) -> None:
+    (tmp_path / "task.py").write_text(
+        "@gen.coroutine\ndef f(): yield g()\n\ndef h(): return gen.Task(f)\n"
+    )
+
+    result = list(transform_files([str(tmp_path / "task.py")], check=True))[0]
+
+    assert result.outcome is Outcome.TRANSFORM_FAILED
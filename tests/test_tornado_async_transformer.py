@@ -3,7 +3,15 @@ from typing import NamedTuple, Tuple
 import libcst
 import pytest
 
-from tornado_async_transformer import TornadoAsyncTransformer, TransformError
+from tornado_async_transformer import (
+    TornadoAsyncTransformer,
+    TransformError,
+    names,
+)
+from tornado_async_transformer import tornado_async_transformer as matchers
+from tornado_async_transformer.helpers import terminal_names
+from tornado_async_transformer.import_aware import ImportAwareTornadoAsyncTransformer
+from tornado_async_transformer.tool import find_trigger_names
 
 from tests.collector import (
     ExceptionCase,
@@ -16,10 +24,90 @@ from tests.collector import (
 @pytest.mark.parametrize("test_case", collect_test_cases())
 def test_python_module(test_case: TestCase) -> None:
     source_tree = libcst.parse_module(test_case.before)
-    visited_tree = source_tree.visit(TornadoAsyncTransformer())
+    transformer = TornadoAsyncTransformer()
+    visited_tree = source_tree.visit(transformer)
+    assert visited_tree.code == test_case.after
+    assert transformer.modified == (not visited_tree.deep_equals(source_tree))
+
+
+@pytest.mark.parametrize("test_case", collect_test_cases())
+def test_python_module_with_pruning(test_case: TestCase) -> None:
+    source_tree = libcst.parse_module(test_case.before)
+    transformer = TornadoAsyncTransformer(
+        possible_trigger_names=find_trigger_names(test_case.before.encode())
+    )
+    visited_tree = source_tree.visit(transformer)
+    assert transformer.prune_outside_coroutines
+    assert visited_tree.code == test_case.after
+
+
+@pytest.mark.parametrize("test_case", collect_test_cases())
+def test_check_python_module(test_case: TestCase) -> None:
+    source_tree = libcst.parse_module(test_case.before)
+    assert TornadoAsyncTransformer().check(source_tree) == (
+        test_case.before != test_case.after
+    )
+
+
+@pytest.mark.parametrize("test_case", collect_test_cases())
+def test_python_module_resolving_imports(test_case: TestCase) -> None:
+    source_tree = libcst.MetadataWrapper(libcst.parse_module(test_case.before))
+    visited_tree = source_tree.visit(ImportAwareTornadoAsyncTransformer())
     assert visited_tree.code == test_case.after
 
 
+def test_resolving_imports_follows_renames_and_ignores_other_coroutines() -> None:
+    before = """from asyncio import coroutine
+from tornado import gen as g
+from tornado.gen import coroutine as co, Return as R
+
+
+@co
+def renamed():
+    yield g.sleep(1)
+    raise R(1)
+
+
+@coroutine
+def not_tornado():
+    yield renamed()
+"""
+    after = """from asyncio import coroutine
+import asyncio
+from tornado import gen as g
+from tornado.gen import coroutine as co, Return as R
+
+
+async def renamed():
+    await asyncio.sleep(1)
+    return 1
+
+
+@coroutine
+def not_tornado():
+    yield renamed()
+"""
+    source_tree = libcst.MetadataWrapper(libcst.parse_module(before))
+    transformer = ImportAwareTornadoAsyncTransformer()
+    assert source_tree.visit(transformer).code == after
+    assert transformer.modified
+
+
+def test_precomputed_names_match_the_matchers() -> None:
+    assert names.gen_return_names == terminal_names(matchers.gen_return_matcher)
+    assert names.gen_sleep_names == terminal_names(matchers.gen_sleep_matcher)
+    assert names.gen_task_names == terminal_names(matchers.gen_task_matcher)
+    assert names.gen_coroutine_decorator_names == terminal_names(
+        matchers.gen_coroutine_decorator_matcher
+    )
+    assert names.coroutine_decorator_names == terminal_names(
+        matchers.coroutine_decorator_matcher
+    )
+    assert names.trigger_names == (
+        terminal_names(matchers.coroutine_matcher) | names.gen_task_names
+    )
+
+
 @pytest.mark.parametrize("exception_case", collect_exception_cases())
 def test_unsupported_python_module(exception_case: ExceptionCase) -> None:
     source_tree = libcst.parse_module(exception_case.source)
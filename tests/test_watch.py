@@ -0,0 +1,118 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from tornado_async_transformer.tool import Outcome
+from tornado_async_transformer.watch import (
+    PollingWatcher,
+    _load_libc,
+    discover,
+    make_watcher,
+    wait_for_changes,
+    watch,
+)
+
+requires_inotify = pytest.mark.skipif(
+    _load_libc() is None, reason="inotify is only available on linux"
+)
+
+UNSUPPORTED = "from tornado import gen\n@gen.coroutine\ndef f(): yield gen.Task(g)\n"
+FIXED = "from tornado import gen\n@gen.coroutine\ndef f(): yield g()\n"
+TRANSFORMED = "from tornado import gen\nasync def f(): await g()\n"
+
+
+def test_polling_watcher_finds_changed_and_new_files(tmp_path: Path) -> None:
+    (tmp_path / "a.py").write_text("a = 1\n")
+    (tmp_path / "b.py").write_text("b = 1\n")
+    watcher = PollingWatcher(lambda: discover([str(tmp_path)]), interval=0.01)
+
+    assert watcher.poll(0.05) == set()
+
+    (tmp_path / "a.py").write_text("a = 22\n")
+    (tmp_path / "package").mkdir()
+    (tmp_path / "package" / "c.py").write_text("c = 1\n")
+
+    assert wait_for_changes(watcher, debounce=0.05) == {
+        str(tmp_path / "a.py"),
+        str(tmp_path / "package" / "c.py"),
+    }
+
+
+@requires_inotify
+def test_inotify_watcher_finds_changed_and_new_files(tmp_path: Path) -> None:
+    (tmp_path / "a.py").write_text("a = 1\n")
+    (tmp_path / "notes.txt").write_text("")
+    watcher = make_watcher([str(tmp_path)])
+    try:
+        assert watcher.poll(0.05) == set()
+
+        (tmp_path / "a.py").write_text("a = 22\n")
+        (tmp_path / "notes.txt").write_text("not python")
+        (tmp_path / "package").mkdir()
+        assert wait_for_changes(watcher, debounce=0.05) == {str(tmp_path / "a.py")}
+
+        # new directories are watched as soon as they show up
+        (tmp_path / "package" / "c.py").write_text("c = 1\n")
+        assert wait_for_changes(watcher, debounce=0.05) == {
+            str(tmp_path / "package" / "c.py")
+        }
+    finally:
+        watcher.close()
+
+
+@requires_inotify
+def test_inotify_watcher_finds_top_level_files_of_a_relative_base(
+    tmp_path: Path, monkeypatch: "pytest.MonkeyPatch"
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.py").write_text("a = 1\n")
+    (tmp_path / "package").mkdir()
+    (tmp_path / "package" / "b.py").write_text("b = 1\n")
+    watcher = make_watcher(["."])
+    try:
+        (tmp_path / "a.py").write_text("a = 22\n")
+        (tmp_path / "package" / "b.py").write_text("b = 22\n")
+        assert {
+            os.path.normpath(filename)
+            for filename in wait_for_changes(watcher, debounce=0.05)
+        } == {"a.py", os.path.join("package", "b.py")}
+    finally:
+        watcher.close()
+
+
+@pytest.mark.parametrize(
+    "poll", [pytest.param(False, marks=requires_inotify), True], ids=["inotify", "poll"]
+)
+def test_watch_retransforms_files_as_they_are_fixed(tmp_path: Path, poll: bool) -> None:
+    (tmp_path / "fixed.py").write_text(UNSUPPORTED)
+    (tmp_path / "other.py").write_text(UNSUPPORTED)
+    runs = watch([str(tmp_path)], jobs=2, debounce=0.05, poll=poll, poll_interval=0.02)
+    try:
+        first_run = next(runs)
+        assert [result.outcome for result in first_run] == [
+            Outcome.TRANSFORM_FAILED,
+            Outcome.TRANSFORM_FAILED,
+        ]
+
+        (tmp_path / "fixed.py").write_text(FIXED)
+        second_run = next(runs)
+    finally:
+        runs.close()
+
+    assert [(result.filename, result.outcome) for result in second_run] == [
+        (str(tmp_path / "fixed.py"), Outcome.CHANGED)
+    ]
+    assert (tmp_path / "fixed.py").read_text() == TRANSFORMED
+
+
+def test_watch_applies_file_budgets(tmp_path: Path) -> None:
+    (tmp_path / "slow.py").write_text(FIXED)
+    runs = watch([str(tmp_path)], file_timeout=0.0001, poll=True)
+    try:
+        first_run = next(runs)
+    finally:
+        runs.close()
+
+    assert [result.outcome for result in first_run] == [Outcome.OVER_BUDGET]
+    assert (tmp_path / "slow.py").read_text() == FIXED
@@ -1 +1,33 @@
-from .tornado_async_transformer import TornadoAsyncTransformer, TransformError
+import sys
+from typing import TYPE_CHECKING, Any
+
+__version__ = "0.2.0"
+
+# The transformer is imported on first use, since importing libcst and building
+# the matchers takes a good half second, which the commandline tool can often
+# skip entirely (e.g. for --help, or when the pre-scan rules out every file).
+# Module level __getattr__ needs python 3.7, so it's imported right away before,
+# and for type checkers.
+_lazy_attributes = {
+    "TornadoAsyncTransformer": "tornado_async_transformer.tornado_async_transformer",
+    "TransformError": "tornado_async_transformer.tornado_async_transformer",
+}
+
+if TYPE_CHECKING or sys.version_info < (3, 7):
+    from .tornado_async_transformer import TornadoAsyncTransformer, TransformError
+else:
+
+    def __getattr__(name: str) -> Any:
+        if name not in _lazy_attributes:
+            raise AttributeError(
+                "module {!r} has no attribute {!r}".format(__name__, name)
+            )
+
+        import importlib
+
+        value = getattr(importlib.import_module(_lazy_attributes[name]), name)
+        globals()[name] = value
+        return value
+
+    def __dir__() -> list:
+        return sorted(list(globals()) + list(_lazy_attributes))
@@ -0,0 +1,153 @@
+"""
+A library interface for embedding the transformer, e.g. in a build system,
+without shelling out to the commandline tool.
+
+    >>> from tornado_async_transformer.api import transform_source
+    >>> print(transform_source("@gen.coroutine\\ndef f(): yield g()\\n").code, end="")
+    async def f(): await g()
+"""
+
+import os
+from itertools import chain
+from typing import Iterable, Iterator, NamedTuple, Optional, Sequence, Union
+
+from tornado_async_transformer.cache import ResultCache
+from tornado_async_transformer.discovery import collect_files, git_files
+from tornado_async_transformer.tool import (
+    DEFAULT_MAX_BYTES_IN_FLIGHT,
+    FileResult,
+    Outcome,
+    find_trigger_names,
+    transform_files,
+)
+
+Path = Union[str, "os.PathLike[str]"]
+
+
+class SourceResult(NamedTuple):
+    """
+    The outcome of transforming a source. `code` is the transformed source,
+    or the original one if it didn't change or couldn't be transformed.
+    """
+
+    code: str
+    outcome: Outcome
+    error: Optional[str] = None
+
+    @property
+    def changed(self) -> bool:
+        return self.outcome is Outcome.CHANGED
+
+
+def transform_source(source: str, resolve_imports: bool = False) -> SourceResult:
+    """
+    Transforms a single source in this process. Only the first call pays for
+    importing libcst and building the matchers, so this is cheap to call once
+    per file from a long-running process.
+
+    >>> transform_source("def f(): yield g()\\n")
+    SourceResult(code='def f(): yield g()\\n', outcome=<Outcome.SKIPPED: 'skipped by pre-scan'>, error=None)
+    """
+    names = find_trigger_names(source.encode())
+    if not names:
+        return SourceResult(source, Outcome.SKIPPED)
+
+    # imported here, so that embedding the api doesn't import libcst until a
+    # source needs it
+    import libcst as cst
+
+    from tornado_async_transformer.import_aware import (
+        ImportAwareTornadoAsyncTransformer,
+    )
+    from tornado_async_transformer.tornado_async_transformer import (
+        TornadoAsyncTransformer,
+        TransformError,
+    )
+
+    try:
+        module = cst.parse_module(source)
+    except Exception as e:
+        return SourceResult(source, Outcome.PARSE_FAILED, str(e))
+
+    try:
+        if resolve_imports:
+            transformer: TornadoAsyncTransformer = ImportAwareTornadoAsyncTransformer(
+                possible_trigger_names=names
+            )
+            visited = cst.MetadataWrapper(module, unsafe_skip_copy=True).visit(
+                transformer
+            )
+        else:
+            transformer = TornadoAsyncTransformer(possible_trigger_names=names)
+            visited = module.visit(transformer)
+    except TransformError as e:
+        return SourceResult(source, Outcome.TRANSFORM_FAILED, str(e))
+    except Exception as e:
+        return SourceResult(source, Outcome.FAILED, repr(e))
+
+    if not transformer.modified:
+        return SourceResult(source, Outcome.UNCHANGED)
+    return SourceResult(visited.code, Outcome.CHANGED)
+
+
+def transform_paths(
+    paths: Iterable[Path],
+    jobs: int = 1,
+    write: bool = True,
+    diff: bool = False,
+    keep_code: bool = False,
+    exclude: Sequence[str] = (),
+    use_gitignore: bool = True,
+    cache: Optional[ResultCache] = None,
+    resolve_imports: bool = False,
+    git_tracked: bool = False,
+    since: Optional[str] = None,
+    chunk_lines: Optional[int] = None,
+    file_timeout: Optional[float] = None,
+    file_max_rss: Optional[int] = None,
+    max_bytes_in_flight: int = DEFAULT_MAX_BYTES_IN_FLIGHT,
+) -> Iterator[FileResult]:
+    """
+    Transforms every python file in `paths`, which may be files or directories
+    to walk like the commandline tool does. Results are yielded lazily, in
+    discovery order, as soon as each file is done, and nothing is printed.
+
+    Changes are written back to the files if `write` is set. A changed file's
+    result carries a unified diff of the change if `diff` is set, and its new
+    code if `keep_code` is set.
+
+    If `git_tracked` is set, only files tracked by git are transformed and if
+    `since` is given, only files that changed since that git revision. Either
+    way the files are listed from git rather than by walking directories, and
+    a GitError is raised right away if they can't be.
+
+    Modules of at least `chunk_lines` lines are transformed a top-level
+    statement at a time, see `tornado_async_transformer.chunked`.
+
+    Files that take longer than `file_timeout` seconds, or more than
+    `file_max_rss` bytes of memory, to transform are skipped, see
+    `tool.transform_files`.
+
+    At most `max_bytes_in_flight` bytes of files are held in memory at once,
+    however many files there are.
+    """
+    filenames: Iterable[str]
+    if git_tracked or since is not None:
+        filenames = list(git_files([os.fspath(path) for path in paths], since, exclude))
+    else:
+        filenames = chain.from_iterable(
+            collect_files(os.fspath(path), exclude, use_gitignore) for path in paths
+        )
+    return transform_files(
+        filenames,
+        jobs=jobs,
+        cache=cache,
+        write=write,
+        diff=diff,
+        resolve_imports=resolve_imports,
+        keep_code=keep_code,
+        chunk_lines=chunk_lines,
+        file_timeout=file_timeout,
+        file_max_rss=file_max_rss,
+        max_bytes_in_flight=max_bytes_in_flight,
+    )
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import NamedTuple, Optional
+
+import tornado_async_transformer
+
+
+class CacheEntry(NamedTuple):
+    outcome: str
+    error: Optional[str] = None
+
+
+def default_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "tornado-async-transformer")
+
+
+def _libcst_version() -> str:
+    try:
+        from importlib.metadata import version
+    except ImportError:  # python < 3.8
+        import pkg_resources
+
+        return pkg_resources.get_distribution("libcst").version
+
+    return version("libcst")
+
+
+# the modules whose code decides a file's outcome. Their source is hashed into
+# every key, so that changing the transformer invalidates the cache even when
+# the package version stays the same.
+TRANSFORMER_MODULES = (
+    "tornado_async_transformer.py",
+    "helpers.py",
+    "names.py",
+    "import_aware.py",
+)
+
+
+def transformer_fingerprint() -> str:
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in TRANSFORMER_MODULES:
+        with open(os.path.join(directory, name), "rb") as module_file:
+            digest.update(module_file.read())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    An on-disk cache of the outcome of transforming a file's contents, for
+    files that didn't need to be rewritten. Entries are keyed on a hash of the
+    file's contents, this package's version, the transformer's source and
+    libcst's version, so upgrading or changing any of them invalidates the
+    whole cache. Caches for different `mode`s, which
+    can have different outcomes for the same file, don't share entries.
+
+    Every entry is its own file and is written atomically with `os.replace`,
+    so any number of processes can read and write the same cache directory at
+    once. Failing to read or write an entry is never fatal: the file is just
+    transformed as if it weren't cached.
+    """
+
+    def __init__(self, directory: str, mode: str = "") -> None:
+        self.directory = directory
+        self.salt = "{}:{}:{}:{}:".format(
+            tornado_async_transformer.__version__,
+            transformer_fingerprint(),
+            _libcst_version(),
+            mode,
+        ).encode()
+
+    def get(self, source: bytes) -> Optional[CacheEntry]:
+        try:
+            with open(self._path(source), "r") as entry_file:
+                return CacheEntry(**json.load(entry_file))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def put(self, source: bytes, entry: CacheEntry) -> None:
+        path = self._path(source)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(fd, "w") as temporary_file:
+                json.dump(entry._asdict(), temporary_file)
+            os.replace(temporary_path, path)
+        except OSError:
+            try:
+                os.unlink(temporary_path)
+            except OSError:
+                pass
+
+    def _path(self, source: bytes) -> str:
+        key = hashlib.sha256(self.salt + source).hexdigest()
+        return os.path.join(self.directory, key[:2], key[2:])
@@ -0,0 +1,247 @@
+"""
+Transforming very large modules one top-level statement at a time.
+
+Python's own `ast` parser is much faster than libcst's, so it's used to find
+where each top-level statement starts and ends. The module is split into a
+chunk per top-level statement (along with the comments and blank lines before
+it, which is where libcst puts them too), and only the chunks that mention one of the transformer's trigger names
+are parsed with libcst and transformed. Every other chunk is spliced back in
+as is, so the result is byte for byte what transforming the whole module would
+produce.
+"""
+
+import ast
+import io
+import tokenize
+from typing import Dict, List, NamedTuple, Optional
+
+import libcst as cst
+
+from tornado_async_transformer.helpers import top_level_imports
+from tornado_async_transformer.tornado_async_transformer import TornadoAsyncTransformer
+
+# tokens that don't start a logical line
+_NON_LOGICAL_TOKENS = frozenset(
+    (
+        tokenize.NL,
+        tokenize.COMMENT,
+        tokenize.INDENT,
+        tokenize.DEDENT,
+        tokenize.ENDMARKER,
+    )
+)
+
+
+class Chunk(NamedTuple):
+    source: str
+    # whether the chunk is an import statement, one of which is needed to add
+    # the transformer's required imports after
+    is_import: bool
+
+
+def split_into_chunks(source: str) -> List[Chunk]:
+    """
+    Splits `source` into a chunk per top-level statement. Joining the chunks'
+    sources gives back `source` exactly. Statements that share a line, or
+    that are separated by more than blank lines and comments (e.g. a lone
+    backslash continuation line), end up in the same chunk. If `ast` can't
+    parse `source`, it's returned as a single chunk.
+
+    >>> [chunk.source for chunk in split_into_chunks("import os\\n\\n@gen.coroutine\\ndef f(): pass\\nx = 1; y = 2\\n")]
+    ['import os\\n', '\\n@gen.coroutine\\ndef f(): pass\\n', 'x = 1; y = 2\\n']
+    """
+    try:
+        statements = ast.parse(source).body
+    except (SyntaxError, ValueError):
+        return [Chunk(source, is_import=True)]
+
+    # with newline="", lines are only split on "\n", "\r\n" and "\r", like
+    # python's tokenizer does when numbering them
+    lines = io.StringIO(source, newline="").readlines()
+
+    # before python 3.8, ast doesn't say where statements end, so where
+    # logical lines start and end is found with the tokenizer instead
+    logical_lines: Optional[Dict[int, int]] = None
+    if statements and getattr(statements[0], "end_lineno", None) is None:
+        try:
+            logical_lines = _logical_lines(source)
+        except (tokenize.TokenError, SyntaxError):
+            return [Chunk(source, is_import=True)]
+
+    # the first line of each chunk, indexed from 0, and whether it has imports
+    starts: Dict[int, bool] = {0: False}
+    chunk_start = 0
+    # the last line of the statements seen so far, numbered from 1
+    end = 0
+    for statement in statements:
+        start = min(
+            [statement.lineno]
+            + [
+                decorator.lineno
+                for decorator in getattr(statement, "decorator_list", ())
+            ]
+        )
+        # where the code before the statement ends, unless that's on the line
+        # the statement starts on (after a `;`)
+        if logical_lines is None:
+            previous_end: Optional[int] = end if start > end else None
+            end = max(end, getattr(statement, "end_lineno", start))
+        else:
+            previous_end = logical_lines.get(start)
+        if previous_end is not None and all(
+            _is_blank_or_comment(line) for line in lines[previous_end : start - 1]
+        ):
+            chunk_start = previous_end
+        is_import = isinstance(statement, (ast.Import, ast.ImportFrom))
+        starts[chunk_start] = starts.get(chunk_start, False) or is_import
+
+    boundaries = sorted(starts) + [len(lines)]
+    return [
+        Chunk("".join(lines[start:end]), starts[start])
+        for start, end in zip(boundaries, boundaries[1:])
+        if start < end
+    ]
+
+
+def _logical_lines(source: str) -> Dict[int, int]:
+    """
+    The lines that a logical line starts on, mapped to the line the logical
+    line before it ends on, both numbered from 1 (0 for the first line).
+
+    >>> _logical_lines("x = (1,\\n2); y = 3\\n# comment\\nz = 4\\n")
+    {1: 0, 4: 2}
+    """
+    starts: Dict[int, int] = {}
+    in_logical_line = False
+    previous_end = 0
+    for token in tokenize.generate_tokens(io.StringIO(source, newline="").readline):
+        if token.type == tokenize.NEWLINE:
+            in_logical_line = False
+            previous_end = token.start[0]
+        elif not in_logical_line and token.type not in _NON_LOGICAL_TOKENS:
+            starts[token.start[0]] = previous_end
+            in_logical_line = True
+    return starts
+
+
+def _is_blank_or_comment(line: str) -> bool:
+    stripped = line.strip(" \t\x0c\r\n")
+    return not stripped or stripped.startswith("#")
+
+
+class ChunkedModule:
+    """
+    A module split into top-level statement chunks, of which only the chunks
+    that could be changed (and the ones that are needed to add imports after)
+    have been parsed with libcst. Visiting it with a TornadoAsyncTransformer
+    gives the same result as visiting the whole module would.
+    """
+
+    def __init__(
+        self, chunks: List[Chunk], modules: Optional[Dict[int, cst.Module]] = None
+    ) -> None:
+        self.chunks = chunks
+        self.modules: Dict[int, cst.Module] = modules or {}
+
+    @classmethod
+    def parse(cls, source: str) -> "ChunkedModule":
+        # imported here, as the tool imports this module
+        from tornado_async_transformer.tool import might_transform
+
+        chunks = split_into_chunks(source)
+        modules: Dict[int, cst.Module] = {}
+        for index, chunk in enumerate(chunks):
+            if not might_transform(chunk.source.encode()):
+                continue
+
+            module = cst.parse_module(chunk.source)
+            if len(chunks) > 1 and module.code != chunk.source:
+                # libcst doesn't give some sources back exactly, so the module
+                # is parsed whole to be changed exactly the way it would be
+                return cls(
+                    [Chunk(source, is_import=True)], {0: cst.parse_module(source)}
+                )
+            modules[index] = module
+
+        return cls(chunks, modules)
+
+    def _module(self, index: int) -> cst.Module:
+        module = self.modules.get(index)
+        if module is None:
+            module = cst.parse_module(self.chunks[index].source)
+        return module
+
+    def visit(self, transformer: TornadoAsyncTransformer) -> "ChunkedModule":
+        """
+        Transforms the parsed chunks. A chunk's statements are visited one at
+        a time rather than as a module, so that the transformer's required
+        imports are added once for the whole module, after its first import.
+        """
+        from tornado_async_transformer.tool import find_trigger_names
+
+        possible_trigger_names = transformer.possible_trigger_names
+        modules: Dict[int, cst.Module] = {}
+        try:
+            for index, module in self.modules.items():
+                if possible_trigger_names is not None:
+                    transformer.possible_trigger_names = find_trigger_names(
+                        self.chunks[index].source.encode()
+                    )
+                transformer.visit_Module(module)
+                modules[index] = module.with_changes(
+                    body=[statement.visit(transformer) for statement in module.body]
+                )
+        finally:
+            transformer.possible_trigger_names = possible_trigger_names
+
+        if transformer.required_imports:
+            self._add_required_imports(transformer, modules)
+
+        return ChunkedModule(self.chunks, modules)
+
+    def _add_required_imports(
+        self, transformer: TornadoAsyncTransformer, modules: Dict[int, cst.Module]
+    ) -> None:
+        import_modules = [
+            (index, modules.get(index) or self._module(index))
+            for index, chunk in enumerate(self.chunks)
+            if chunk.is_import
+        ]
+
+        # leave_Module only knows about the imports of the chunk it's given,
+        # so imports any chunk already has are left out up front
+        existing_imports = [
+            statement
+            for _, module in import_modules
+            for statement in top_level_imports(module)
+        ]
+        required_imports = transformer.required_imports
+        transformer.required_imports = {
+            required_import
+            for required_import in required_imports
+            if not any(
+                transformer.make_simple_package_import(required_import).deep_equals(
+                    existing_import
+                )
+                for existing_import in existing_imports
+            )
+        }
+        try:
+            for index, module in import_modules:
+                try:
+                    modules[index] = transformer.leave_Module(module, module)
+                    return
+                except RuntimeError:
+                    # e.g. `import os; import sys`, which isn't an import line
+                    continue
+        finally:
+            transformer.required_imports = required_imports
+
+        raise RuntimeError("Failed to add imports")
+
+    @property
+    def code(self) -> str:
+        return "".join(
+            self.modules[index].code if index in self.modules else chunk.source
+            for index, chunk in enumerate(self.chunks)
+        )
@@ -0,0 +1,86 @@
+from contextlib import ExitStack, contextmanager
+from typing import Collection, Iterator, List, Optional, Sequence, Union
+
+import libcst as cst
+from libcst.metadata import ProviderT
+
+
+class CompositeTransformer(cst.CSTTransformer):
+    """
+    Runs several transformers over a module in a single traversal, so a module
+    is parsed, walked and generated once no matter how many codemods run on it.
+
+    For every node, the transformers are visited in order and left in order,
+    with each transformer's `leave_` result handed on to the next one, just as
+    if they had run one after another. Once a transformer removes a node or
+    replaces it with a different kind of node, the transformers after it still
+    leave the node, to keep their own state balanced, but their changes to it
+    are dropped.
+
+    A transformer that returns False from `visit_` skips that node's children
+    without stopping the other transformers from visiting them.
+
+    >>> from tornado_async_transformer import TornadoAsyncTransformer
+    >>> class Rename(cst.CSTTransformer):
+    ...     def leave_Name(self, node, updated_node):
+    ...         return updated_node.with_changes(value=updated_node.value.replace("old", "new"))
+    >>> module = cst.parse_module("from tornado import gen\\n@gen.coroutine\\ndef old(): yield old_f()\\n")
+    >>> print(module.visit(CompositeTransformer([TornadoAsyncTransformer(), Rename()])).code, end="")
+    from tornado import gen
+    async def new(): await new_f()
+    """
+
+    def __init__(self, transformers: Sequence[cst.CSTTransformer]) -> None:
+        self.transformers = list(transformers)
+        # the node at which each transformer stopped visiting children, if any
+        self.suspended_at: List[Optional[cst.CSTNode]] = [None] * len(self.transformers)
+
+    def get_inherited_dependencies(self) -> Collection[ProviderT]:  # type: ignore
+        return frozenset(
+            dependency
+            for transformer in self.transformers
+            for dependency in transformer.get_inherited_dependencies()
+        )
+
+    @contextmanager
+    def resolve(self, wrapper: cst.MetadataWrapper) -> Iterator[None]:
+        # metadata is computed once by the wrapper and shared by every
+        # transformer that depends on it
+        with ExitStack() as stack:
+            for transformer in self.transformers:
+                stack.enter_context(transformer.resolve(wrapper))
+            yield
+
+    def on_visit(self, node: cst.CSTNode) -> bool:
+        for index, transformer in enumerate(self.transformers):
+            if self.suspended_at[index] is None and not transformer.on_visit(node):
+                self.suspended_at[index] = node
+
+        return any(suspended_at is None for suspended_at in self.suspended_at)
+
+    def on_visit_attribute(self, node: cst.CSTNode, attribute: str) -> None:
+        for index, transformer in enumerate(self.transformers):
+            if self.suspended_at[index] is None:
+                transformer.on_visit_attribute(node, attribute)
+
+    def on_leave_attribute(self, original_node: cst.CSTNode, attribute: str) -> None:
+        for index, transformer in enumerate(self.transformers):
+            if self.suspended_at[index] is None:
+                transformer.on_leave_attribute(original_node, attribute)
+
+    def on_leave(
+        self, original_node: cst.CSTNode, updated_node: cst.CSTNode
+    ) -> Union[cst.CSTNode, cst.RemovalSentinel]:
+        result: Union[cst.CSTNode, cst.RemovalSentinel] = updated_node
+        for index, transformer in enumerate(self.transformers):
+            suspended_at = self.suspended_at[index]
+            if suspended_at is not None and suspended_at is not original_node:
+                continue
+            self.suspended_at[index] = None
+
+            if isinstance(result, type(original_node)):
+                result = transformer.on_leave(original_node, result)
+            else:
+                transformer.on_leave(original_node, updated_node)
+
+        return result
@@ -0,0 +1,349 @@
+import fnmatch
+import os
+import re
+import subprocess
+from typing import (
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+)
+
+# Directories that never contain code worth transforming, but often contain a
+# huge number of files. Virtualenvs are also skipped, by looking for the
+# `pyvenv.cfg` file at their root.
+DEFAULT_EXCLUDES = (
+    ".git",
+    ".hg",
+    ".svn",
+    ".tox",
+    ".nox",
+    ".mypy_cache",
+    ".pytest_cache",
+    "__pycache__",
+    "node_modules",
+    "site-packages",
+)
+
+
+class GitError(Exception):
+    """
+    Error raised when files can't be listed with git, e.g. outside of a git
+    repository or for an unknown revision.
+    """
+
+
+class IgnoreRule(NamedTuple):
+    pattern: Pattern[str]
+    negated: bool
+    directory_only: bool
+    # anchored rules are matched against the path relative to the .gitignore's
+    # directory, other rules against just the basename
+    anchored: bool
+
+
+class IgnoreFile(NamedTuple):
+    rules: Tuple[IgnoreRule, ...]
+    # path of the directory currently being walked, relative to the directory
+    # containing the .gitignore file, e.g. "" or "src/app/"
+    prefix: str
+
+
+def parse_gitignore(lines: Iterable[str]) -> Tuple[IgnoreRule, ...]:
+    """
+    Parses the lines of a .gitignore file into rules. This supports the commonly
+    used subset of the format: comments, negation, directory-only patterns,
+    anchoring and `*`, `?`, `[...]` and `**` wildcards.
+
+    >>> [rule.anchored for rule in parse_gitignore(["# comment", "*.pyc", "/build/", "docs/*.py"])]
+    [False, True, True]
+    """
+    rules: List[IgnoreRule] = []
+    for line in lines:
+        line = line.rstrip("\n").rstrip()
+        if not line or line.startswith("#"):
+            continue
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if not line:
+            continue
+
+        rules.append(
+            IgnoreRule(
+                pattern=re.compile(_translate_gitignore_pattern(line)),
+                negated=negated,
+                directory_only=directory_only,
+                anchored=anchored,
+            )
+        )
+
+    return tuple(rules)
+
+
+def _translate_gitignore_pattern(pattern: str) -> str:
+    """
+    >>> _translate_gitignore_pattern("**/build/*.py")
+    '(?:.*/)?build/[^/]*\\\\.py\\\\Z'
+    """
+    regex = ""
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            regex += "(?:.*/)?"
+            index += 3
+        elif pattern.startswith("**", index):
+            regex += ".*"
+            index += 2
+        elif pattern[index] == "*":
+            regex += "[^/]*"
+            index += 1
+        elif pattern[index] == "?":
+            regex += "[^/]"
+            index += 1
+        elif pattern[index] == "[" and "]" in pattern[index + 2 :]:
+            end = pattern.index("]", index + 2)
+            character_class = pattern[index + 1 : end]
+            if character_class.startswith("!"):
+                character_class = "^" + character_class[1:]
+            regex += "[" + character_class.replace("\\", "\\\\") + "]"
+            index = end + 1
+        else:
+            regex += re.escape(pattern[index])
+            index += 1
+
+    return regex + r"\Z"
+
+
+def _is_ignored(name: str, is_dir: bool, ignore_files: Sequence[IgnoreFile]) -> bool:
+    # as with git, the last matching rule wins and rules from deeper .gitignore
+    # files take precedence over ones from their parents.
+    ignored = False
+    for ignore_file in ignore_files:
+        for rule in ignore_file.rules:
+            if rule.directory_only and not is_dir:
+                continue
+            path = ignore_file.prefix + name if rule.anchored else name
+            if rule.pattern.match(path):
+                ignored = not rule.negated
+
+    return ignored
+
+
+def _read_gitignore(directory: str) -> Optional[IgnoreFile]:
+    try:
+        with open(os.path.join(directory, ".gitignore"), "r") as gitignore:
+            rules = parse_gitignore(gitignore)
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    return IgnoreFile(rules, prefix="") if rules else None
+
+
+def _parent_gitignores(base: str) -> List[IgnoreFile]:
+    """
+    The .gitignore files that apply to `base` from the directories above it, up
+    to the root of the git repository containing it. Outside of a git
+    repository, no .gitignore files above `base` apply.
+    """
+    ignore_files: List[IgnoreFile] = []
+    directory = os.path.abspath(base)
+    prefix = ""
+    while not os.path.exists(os.path.join(directory, ".git")):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return []
+        prefix = os.path.basename(directory) + "/" + prefix
+        directory = parent
+        ignore_file = _read_gitignore(directory)
+        if ignore_file is not None:
+            ignore_files.insert(0, ignore_file._replace(prefix=prefix))
+
+    return ignore_files
+
+
+def is_python_filename(filename: str) -> bool:
+    return filename.endswith((".py", ".pyi"))
+
+
+def collect_files(
+    base: str, exclude: Sequence[str] = (), use_gitignore: bool = True
+) -> Iterator[str]:
+    """
+    Lazily collect all python files under a base directory.
+
+    Directories are walked with `os.scandir`, in sorted order so runs are
+    deterministic. Directories matching `DEFAULT_EXCLUDES`, virtualenvs, any of
+    the `exclude` globs (matched against both the name and the path relative
+    to `base`) and, if `use_gitignore` is set, anything ignored by a .gitignore
+    file are pruned rather than walked.
+    """
+    for path, is_directory in walk(base, exclude, use_gitignore):
+        if not is_directory:
+            yield path
+
+
+def walk(
+    base: str, exclude: Sequence[str] = (), use_gitignore: bool = True
+) -> Iterator[Tuple[str, bool]]:
+    """
+    Like `collect_files`, but also yields every directory that's walked, each
+    one before the files in it, as `(path, is_directory)` pairs.
+    """
+    if os.path.isfile(base):
+        if is_python_filename(base):
+            yield base, False
+        return
+
+    if not os.path.isdir(base):
+        return
+
+    exclude = tuple(DEFAULT_EXCLUDES) + tuple(exclude)
+    ignore_files = _parent_gitignores(base) if use_gitignore else []
+
+    # a stack of (directory, path relative to base, applicable .gitignores)
+    stack = [(base, "", ignore_files)]
+    while stack:
+        directory, relative_directory, ignore_files = stack.pop()
+        try:
+            with os.scandir(directory) as scanned:
+                entries = sorted(scanned, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        names = {entry.name for entry in entries}
+        if "pyvenv.cfg" in names:
+            continue
+        yield directory, True
+
+        if use_gitignore and ".gitignore" in names:
+            ignore_file = _read_gitignore(directory)
+            if ignore_file is not None:
+                ignore_files = ignore_files + [ignore_file]
+
+        subdirectories = []
+        for entry in entries:
+            relative_path = relative_directory + entry.name
+            if any(
+                fnmatch.fnmatchcase(entry.name, pattern)
+                or fnmatch.fnmatchcase(relative_path, pattern)
+                for pattern in exclude
+            ):
+                continue
+
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                continue
+
+            if not (is_dir or (is_file and is_python_filename(entry.name))):
+                continue
+
+            if ignore_files and _is_ignored(entry.name, is_dir, ignore_files):
+                continue
+
+            if is_dir:
+                subdirectories.append(
+                    (
+                        entry.path,
+                        relative_path + "/",
+                        [
+                            ignore_file._replace(
+                                prefix=ignore_file.prefix + entry.name + "/"
+                            )
+                            for ignore_file in ignore_files
+                        ],
+                    )
+                )
+            else:
+                yield entry.path, False
+
+        stack.extend(reversed(subdirectories))
+
+
+def git_files(
+    bases: Sequence[str], since: Optional[str] = None, exclude: Sequence[str] = ()
+) -> Iterator[str]:
+    """
+    Lists the python files in `bases` that are tracked by git or, if `since` is
+    given, that have changed in the working tree since it branched off the
+    revision `since` (changes made on `since` after that are left out, as with
+    `git diff since...`).
+    The list comes straight from git's index, so untracked directories (build
+    output, virtualenvs...) cost nothing, however big they are.
+
+    Files are skipped if any directory on their path, or the path itself,
+    matches `DEFAULT_EXCLUDES` or the `exclude` globs.
+    """
+    if since is None:
+        # paths are listed relative to the working directory
+        root = ""
+        command = ["git", "ls-files", "-z", "--"]
+    else:
+        # paths are listed relative to the root of the repository
+        root = _git(["git", "rev-parse", "--show-toplevel"]).strip()
+        # `git diff since...` would leave out uncommitted changes, and diffing
+        # against `since` itself would pick up everything changed upstream
+        merge_base = _git(["git", "merge-base", since, "HEAD"]).strip()
+        command = [
+            "git",
+            "diff",
+            "--name-only",
+            "-z",
+            "--diff-filter=d",
+            merge_base,
+            "--",
+        ]
+
+    exclude = tuple(DEFAULT_EXCLUDES) + tuple(exclude)
+    for name in _git(command + list(bases)).split("\0"):
+        if not name or not is_python_filename(name):
+            continue
+
+        path = os.path.relpath(os.path.join(root, name)) if root else name
+        if _is_excluded(path, exclude) or not os.path.isfile(path):
+            continue
+
+        yield path
+
+
+def _git(command: List[str]) -> str:
+    try:
+        result = subprocess.run(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True
+        )
+    except OSError as e:
+        raise GitError("couldn't run git: {}".format(e))
+    except subprocess.CalledProcessError as e:
+        raise GitError(os.fsdecode(e.stderr).strip() or str(e))
+
+    return os.fsdecode(result.stdout)
+
+
+def _is_excluded(path: str, exclude: Sequence[str]) -> bool:
+    """
+    >>> _is_excluded("app/generated/models.py", ["app/gen*"])
+    True
+    >>> _is_excluded("app/handlers.py", ["node_modules", "*_test.py"])
+    False
+    """
+    parts = path.split(os.sep)
+    return any(
+        fnmatch.fnmatchcase(parts[index], pattern)
+        or fnmatch.fnmatchcase("/".join(parts[: index + 1]), pattern)
+        for index in range(len(parts))
+        for pattern in exclude
+    )
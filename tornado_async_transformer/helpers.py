@@ -1,5 +1,6 @@
+import dataclasses
 from functools import singledispatch
-from typing import List, Sequence, Union
+from typing import AbstractSet, FrozenSet, Iterable, List, Optional, Sequence, Union
 
 import libcst as cst
 from libcst import matchers as m
@@ -10,13 +11,31 @@ def with_added_imports(
 ) -> cst.Module:
     """
     Adds new import `import_node` after the first import in the module `module_node`.
+    Imports the module already has at the top level aren't added again, so several
+    transformers can each add the imports they need to the same module.
+
+    >>> module = cst.parse_module("import os\\nimport asyncio\\n")
+    >>> imports = [cst.Import(names=[cst.ImportAlias(name=cst.Name(name))]) for name in ("asyncio", "sys")]
+    >>> print(with_added_imports(module, imports).code, end="")
+    import os
+    import sys
+    import asyncio
     """
+    existing_imports = top_level_imports(module_node)
+    missing_imports: List[Union[cst.Import, cst.ImportFrom]] = []
+    for import_node in import_nodes:
+        if not any(
+            import_node.deep_equals(existing_import)
+            for existing_import in existing_imports + missing_imports
+        ):
+            missing_imports.append(import_node)
+
     updated_body: List[Union[cst.SimpleStatementLine, cst.BaseCompoundStatement]] = []
     added_import = False
     for line in module_node.body:
         updated_body.append(line)
         if not added_import and _is_import_line(line):
-            for import_node in import_nodes:
+            for import_node in missing_imports:
                 updated_body.append(cst.SimpleStatementLine(body=tuple([import_node])))
             added_import = True
 
@@ -26,6 +45,19 @@ def with_added_imports(
     return module_node.with_changes(body=tuple(updated_body))
 
 
+def top_level_imports(module_node: cst.Module) -> List[cst.BaseSmallStatement]:
+    """
+    The imports on the module's import lines, i.e. the imports that
+    `with_added_imports` won't add again.
+    """
+    return [
+        statement
+        for line in module_node.body
+        if _is_import_line(line)
+        for statement in line.body
+    ]
+
+
 def _is_import_line(
     line: Union[cst.SimpleStatementLine, cst.BaseCompoundStatement]
 ) -> bool:
@@ -98,3 +130,96 @@ def some_version_of(tag: str) -> m.OneOf[m.Union[m.Name, m.Attribute]]:
     Poorly named wrapper around name_attr_possibilities.
     """
     return m.OneOf(*name_attr_possibilities(tag))
+
+
+def terminal_names(matcher: object) -> FrozenSet[str]:
+    """
+    Collects the rightmost names (the `Name.value` of a Name, or the `attr` of an Attribute) that a
+    matcher looks for, walking through OneOfs, wildcards and the fields of node matchers.
+
+    Any node matched by `matcher` must contain one of these names in its source, which makes them
+    useful for cheaply ruling out source that can't possibly match before parsing it.
+
+    >>> sorted(terminal_names(some_version_of("tornado.gen.coroutine")))
+    ['coroutine']
+
+    >>> sorted(terminal_names(m.Call(func=some_version_of("gen.sleep")) | m.Decorator(decorator=m.Name("gen_test"))))
+    ['gen_test', 'sleep']
+    """
+    if isinstance(matcher, m.Name):
+        return (
+            frozenset([matcher.value])
+            if isinstance(matcher.value, str)
+            else frozenset()
+        )
+
+    if isinstance(matcher, m.Attribute):
+        return terminal_names(matcher.attr)
+
+    if isinstance(matcher, m.OneOf):
+        return _union_of_terminal_names(matcher.options)
+
+    if isinstance(matcher, (m.AtLeastN, m.AtMostN)):
+        return terminal_names(matcher.matcher)
+
+    if isinstance(matcher, (list, tuple)):
+        return _union_of_terminal_names(matcher)
+
+    if dataclasses.is_dataclass(matcher):
+        return _union_of_terminal_names(
+            getattr(matcher, field.name) for field in dataclasses.fields(matcher)
+        )
+
+    return frozenset()
+
+
+def _union_of_terminal_names(matchers: Iterable[object]) -> FrozenSet[str]:
+    names: FrozenSet[str] = frozenset()
+    for matcher in matchers:
+        names |= terminal_names(matcher)
+    return names
+
+
+def terminal_name(node: cst.CSTNode) -> Optional[str]:
+    """
+    The rightmost name of a Name or (nested) Attribute node, e.g. "coroutine" for
+    `tornado.gen.coroutine`. Calls are seen through to the function being called.
+
+    >>> terminal_name(cst.parse_expression("tornado.gen.coroutine"))
+    'coroutine'
+    >>> terminal_name(cst.parse_expression("gen.Return(value)"))
+    'Return'
+    >>> terminal_name(cst.parse_expression("handlers[0]")) is None
+    True
+    """
+    if isinstance(node, cst.Call):
+        node = node.func
+
+    if isinstance(node, cst.Name):
+        return node.value
+
+    if isinstance(node, cst.Attribute):
+        return node.attr.value
+
+    return None
+
+
+def matches_by_terminal_name(
+    node: cst.CSTNode,
+    expression: cst.CSTNode,
+    names: AbstractSet[str],
+    matcher: m.BaseMatcherNode,
+) -> bool:
+    """
+    Matches `node` against `matcher`, but only runs the comparatively expensive
+    structural match if the rightmost name of `expression` (the part of `node`
+    that `matcher` checks the name of) is one of `names`, which should be
+    `terminal_names(matcher)`. Almost all nodes are ruled out by that string
+    lookup alone.
+
+    >>> decorator = cst.Decorator(decorator=cst.parse_expression("gen.coroutine"))
+    >>> matcher = m.Decorator(decorator=some_version_of("tornado.gen.coroutine"))
+    >>> matches_by_terminal_name(decorator, decorator.decorator, terminal_names(matcher), matcher)
+    True
+    """
+    return terminal_name(expression) in names and m.matches(node, matcher)
@@ -0,0 +1,73 @@
+import inspect
+from typing import Collection, Optional
+
+import libcst as cst
+from libcst.metadata import ProviderT, QualifiedName, QualifiedNameProvider
+
+from tornado_async_transformer.tornado_async_transformer import TornadoAsyncTransformer
+
+GEN_COROUTINE = "tornado.gen.coroutine"
+GEN_TEST = "tornado.testing.gen_test"
+GEN_RETURN = "tornado.gen.Return"
+GEN_SLEEP = "tornado.gen.sleep"
+GEN_TASK = "tornado.gen.Task"
+
+
+class ImportAwareTornadoAsyncTransformer(TornadoAsyncTransformer):
+    """
+    A TornadoAsyncTransformer that resolves what decorators, calls and raised
+    exceptions refer to through the module's imports, instead of matching
+    them by how they're spelled. This catches renamed imports, like
+    `from tornado import gen as g` or `from tornado.gen import coroutine as co`,
+    and no longer mistakes e.g. asyncio's bare `@coroutine` for tornado's.
+
+    Resolving imports requires visiting through a `libcst.MetadataWrapper`,
+    which is much more expensive than visiting the module directly, so this is
+    best reserved for modules that a cheap textual scan found to be candidates.
+
+    >>> module = cst.parse_module("from tornado import gen as g\\n@g.coroutine\\ndef f(): yield g.sleep(1)\\n")
+    >>> print(cst.MetadataWrapper(module).visit(ImportAwareTornadoAsyncTransformer()).code, end="")
+    from tornado import gen as g
+    import asyncio
+    async def f(): await asyncio.sleep(1)
+    """
+
+    METADATA_DEPENDENCIES = (QualifiedNameProvider,)
+
+    @classmethod
+    def get_inherited_dependencies(cls) -> Collection[ProviderT]:
+        # libcst caches this on the class it's first called on, so once it's been
+        # called on TornadoAsyncTransformer, subclasses inherit its empty result.
+        return frozenset(
+            dependency
+            for klass in inspect.getmro(cls)
+            for dependency in getattr(klass, "METADATA_DEPENDENCIES", ())
+        )
+
+    def refers_to(self, node: Optional[cst.CSTNode], qualified_name: str) -> bool:
+        if isinstance(node, cst.Call):
+            node = node.func
+        if node is None:
+            return False
+
+        qualified_names: Collection[QualifiedName] = self.get_metadata(
+            QualifiedNameProvider, node, set()
+        )
+        return any(name.name == qualified_name for name in qualified_names)
+
+    def is_coroutine_decorator(self, node: cst.Decorator) -> bool:
+        return self.refers_to(node.decorator, GEN_COROUTINE) or self.refers_to(
+            node.decorator, GEN_TEST
+        )
+
+    def is_gen_coroutine_decorator(self, node: cst.Decorator) -> bool:
+        return self.refers_to(node.decorator, GEN_COROUTINE)
+
+    def is_gen_return(self, node: cst.Raise) -> bool:
+        return self.refers_to(node.exc, GEN_RETURN)
+
+    def is_gen_sleep(self, node: cst.Call) -> bool:
+        return self.refers_to(node.func, GEN_SLEEP)
+
+    def is_gen_task(self, node: cst.Call) -> bool:
+        return self.refers_to(node.func, GEN_TASK)
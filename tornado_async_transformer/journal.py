@@ -0,0 +1,100 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, Iterator, Optional
+
+# outcomes that might not happen again, e.g. a worker that was killed or ran out
+# of time or memory, so their files are transformed again on resume
+RETRIED_OUTCOMES = frozenset(("FAILED", "OVER_BUDGET"))
+
+
+class Journal:
+    """
+    An append-only record of the files a run has finished, so an interrupted
+    run can be resumed by skipping them. Each finished file is a line of json
+    with its path, outcome and error. Files whose last outcome is one of
+    `RETRIED_OUTCOMES` aren't skipped.
+
+    Writes are buffered and fsynced in batches, every `sync_every` files or
+    `sync_interval` seconds, whichever comes first. A crash can lose at most
+    the last batch, whose files are just transformed again on resume, and
+    a line cut short by a crash is ignored.
+    """
+
+    def __init__(
+        self, path: str, sync_every: int = 100, sync_interval: float = 1.0
+    ) -> None:
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.done: Dict[str, str] = self._load(path)
+        self.skipped = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._file = open(path, "a", encoding="utf-8")
+        if self._file.tell() > 0 and not self._ends_with_newline(path):
+            # don't append to a line that was cut short
+            self._file.write("\n")
+
+    @staticmethod
+    def _load(path: str) -> Dict[str, str]:
+        done: Dict[str, str] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    try:
+                        entry = json.loads(line)
+                        done[entry["filename"]] = entry["outcome"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
+        return done
+
+    @staticmethod
+    def _ends_with_newline(path: str) -> bool:
+        with open(path, "rb") as journal_file:
+            journal_file.seek(-1, os.SEEK_END)
+            return journal_file.read(1) == b"\n"
+
+    @staticmethod
+    def _key(filename: str) -> str:
+        return os.path.normpath(filename)
+
+    def __contains__(self, filename: str) -> bool:
+        outcome = self.done.get(self._key(filename))
+        return outcome is not None and outcome not in RETRIED_OUTCOMES
+
+    def pending(self, filenames: Iterable[str]) -> Iterator[str]:
+        """
+        Lazily filters out the files that are already done, counting them in
+        `skipped`.
+        """
+        for filename in filenames:
+            if filename in self:
+                self.skipped += 1
+            else:
+                yield filename
+
+    def record(self, filename: str, outcome: str, error: Optional[str] = None) -> None:
+        entry = {"filename": self._key(filename), "outcome": outcome, "error": error}
+        self._file.write(json.dumps(entry) + "\n")
+        self.done[entry["filename"]] = entry["outcome"]
+        self._unsynced += 1
+        if (
+            self._unsynced >= self.sync_every
+            or time.monotonic() - self._last_sync >= self.sync_interval
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
@@ -0,0 +1,19 @@
+"""
+The rightmost names each of the transformer's matchers can match, see
+`helpers.terminal_names`. They're written out here rather than computed from
+the matchers, so that they're available without importing libcst or building
+the matchers, e.g. for the tool's pre-scan. The tests check them against the
+matchers.
+"""
+
+from typing import FrozenSet
+
+gen_return_names: FrozenSet[str] = frozenset({"Return"})
+gen_sleep_names: FrozenSet[str] = frozenset({"sleep"})
+gen_task_names: FrozenSet[str] = frozenset({"Task"})
+gen_coroutine_decorator_names: FrozenSet[str] = frozenset({"coroutine"})
+coroutine_decorator_names: FrozenSet[str] = frozenset({"coroutine", "gen_test"})
+
+# Every other matcher only applies inside of a coroutine, so a module that doesn't
+# mention any of these names can't be changed (or rejected) by the transformer.
+trigger_names: FrozenSet[str] = coroutine_decorator_names | gen_task_names
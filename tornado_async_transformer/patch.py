@@ -0,0 +1,79 @@
+import difflib
+import os
+import subprocess
+from functools import lru_cache
+from typing import List, Optional
+
+NO_NEWLINE_AT_END_OF_FILE = "\\ No newline at end of file\n"
+
+
+def _lines(text: str) -> List[str]:
+    # unlike str.splitlines, only split on "\n", as git and patch do
+    lines = [line + "\n" for line in text.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    return lines if lines[-1] else lines[:-1]
+
+
+@lru_cache(maxsize=None)
+def _repository_root(directory: str) -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"],
+            cwd=directory,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return os.fsdecode(result.stdout).strip() or None
+
+
+def patch_path(filename: str) -> str:
+    """
+    The path of `filename` in a patch: relative to the root of the git
+    repository it's in, like `git diff` does, or else to the current directory.
+    """
+    root = _repository_root(os.path.dirname(os.path.abspath(filename)))
+    if root is not None:
+        path = os.path.relpath(os.path.realpath(filename), os.path.realpath(root))
+        if not path.startswith(os.pardir + os.sep):
+            return path.replace(os.sep, "/")
+    return os.path.relpath(filename).replace(os.sep, "/")
+
+
+def unified_diff(filename: str, before: str, after: str) -> str:
+    """
+    A unified diff from `before` to `after` in the format produced by `git diff`,
+    so that patches built from these can be applied with `git apply` from the
+    root of the repository (or, outside of one, from the current directory) or
+    `patch -p1`. Identical texts produce no diff at all.
+
+    >>> print(unified_diff("app/ping.py", "def ping():\\n    pass", "async def ping():\\n    pass"), end="")
+    diff --git a/app/ping.py b/app/ping.py
+    --- a/app/ping.py
+    +++ b/app/ping.py
+    @@ -1,2 +1,2 @@
+    -def ping():
+    +async def ping():
+         pass
+    \\ No newline at end of file
+    """
+    path = patch_path(filename)
+    diff_lines = list(
+        difflib.unified_diff(
+            _lines(before), _lines(after), "a/" + path, "b/" + path, n=3
+        )
+    )
+    if not diff_lines:
+        return ""
+
+    # difflib passes the last line of a file without a trailing newline through
+    # as is, where git marks it instead.
+    patch = ["diff --git a/{0} b/{0}\n".format(path)]
+    for line in diff_lines:
+        patch.append(line)
+        if not line.endswith("\n"):
+            patch.append("\n" + NO_NEWLINE_AT_END_OF_FILE)
+
+    return "".join(patch)
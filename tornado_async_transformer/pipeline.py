@@ -0,0 +1,226 @@
+"""
+Streaming files through reading, transforming and writing, each stage in its
+own thread so that reading and writing files overlaps with transforming them.
+
+The stages are connected by bounded queues, and the total size of the files
+that have been read but not yet written back is capped. Memory use therefore
+stays flat no matter how many files there are.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Generic,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    TypeVar,
+)
+
+R = TypeVar("R")
+
+# how often blocked stages check whether the pipeline was closed, in seconds
+POLL_INTERVAL = 0.1
+
+# marks the end of a stage's output
+_DONE = object()
+
+
+class SourceFile(NamedTuple):
+    """
+    A file that's been read, to be handed to the transforming stage.
+    """
+
+    filename: str
+    # None if the file couldn't be read, in which case it's left to the
+    # transforming stage to read it again and report why it can't be
+    source: Optional[bytes]
+    read_time: float = 0.0
+
+
+class ByteBudget:
+    """
+    Caps the total size of the files in flight. A file that's bigger than the
+    cap on its own is still let through, once nothing else is in flight.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.in_flight = 0
+        self.peak = 0
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int) -> bool:
+        """
+        Waits until there's room for `size` more bytes. Returns False if the
+        budget was closed in the meantime.
+        """
+        with self._condition:
+            while (
+                not self.closed
+                and self.in_flight > 0
+                and self.in_flight + size > self.limit
+            ):
+                self._condition.wait()
+            if self.closed:
+                return False
+            self.in_flight += size
+            self.peak = max(self.peak, self.in_flight)
+            return True
+
+    def release(self, size: int) -> None:
+        with self._condition:
+            self.in_flight -= size
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+def read_source_file(filename: str) -> SourceFile:
+    start = time.perf_counter()
+    try:
+        with open(filename, "rb") as python_file:
+            source: Optional[bytes] = python_file.read()
+    except OSError:
+        source = None
+    return SourceFile(filename, source, time.perf_counter() - start)
+
+
+class Pipeline(Generic[R]):
+    """
+    Reads `filenames`, passes them through `transform` and their results
+    through `finish`, yielding the finished results in the same order as
+    `filenames`.
+
+    `transform` is handed an iterator of SourceFiles and has to yield exactly
+    one result per file, in order. It's run in a thread of its own, and is
+    free to farm the work out to processes. `finish` is called on every result,
+    in the writing stage's thread.
+
+    At most `max_bytes_in_flight` bytes of files are held between reading a
+    file and its finished result being taken off the pipeline, and every queue
+    holds at most `queue_size` items.
+    """
+
+    def __init__(
+        self,
+        filenames: Iterable[str],
+        transform: Callable[[Iterator[SourceFile]], Iterator[R]],
+        finish: Callable[[R], R],
+        max_bytes_in_flight: int,
+        queue_size: int = 16,
+    ) -> None:
+        self.filenames = filenames
+        self.transform = transform
+        self.finish = finish
+        self.budget = ByteBudget(max_bytes_in_flight)
+        self.stopped = threading.Event()
+        self.error: Optional[BaseException] = None
+
+        self.sources: "queue.Queue[Any]" = queue.Queue(queue_size)
+        self.results: "queue.Queue[Any]" = queue.Queue(queue_size)
+        self.finished: "queue.Queue[Any]" = queue.Queue(queue_size)
+        # the budget taken by each file in flight, in order, since results
+        # come back in the same order as the files were read
+        self.sizes: Deque[int] = deque()
+
+        self.threads = [
+            threading.Thread(
+                target=self._run_stage, args=(stage, output), name=stage.__name__
+            )
+            for stage, output in (
+                (self._read, self.sources),
+                (self._transform, self.results),
+                (self._write, self.finished),
+            )
+        ]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def _put(self, output: "queue.Queue[Any]", item: Any) -> bool:
+        while not self.stopped.is_set():
+            try:
+                output.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, items: "queue.Queue[Any]") -> Iterator[Any]:
+        while not self.stopped.is_set():
+            try:
+                item = items.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+    def _run_stage(self, stage: Callable[[], None], output: "queue.Queue[Any]") -> None:
+        try:
+            stage()
+        except BaseException as e:
+            if self.error is None:
+                self.error = e
+            # the other stages might be waiting on this one forever otherwise
+            self.stopped.set()
+            self.budget.close()
+        finally:
+            self._put(output, _DONE)
+
+    def _read(self) -> None:
+        for filename in self.filenames:
+            try:
+                size = os.path.getsize(filename)
+            except OSError:
+                size = 0
+            if not self.budget.acquire(size):
+                return
+            self.sizes.append(size)
+            if not self._put(self.sources, read_source_file(filename)):
+                return
+
+    def _transform(self) -> None:
+        results = self.transform(self._get(self.sources))
+        try:
+            for result in results:
+                if not self._put(self.results, result):
+                    return
+        finally:
+            close = getattr(results, "close", None)
+            if close is not None:
+                close()
+
+    def _write(self) -> None:
+        for result in self._get(self.results):
+            finished = self.finish(result)
+            if not self._put(self.finished, finished):
+                return
+            self.budget.release(self.sizes.popleft())
+
+    def __iter__(self) -> Iterator[R]:
+        try:
+            yield from self._get(self.finished)
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.stopped.set()
+        self.budget.close()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join()
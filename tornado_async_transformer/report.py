@@ -0,0 +1,87 @@
+import json
+import math
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence
+
+if TYPE_CHECKING:
+    from tornado_async_transformer.tool import FileResult
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values: Sequence[float], percent: float) -> float:
+    """
+    The nearest-rank percentile of already sorted values.
+
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 50)
+    2.0
+    >>> percentile([1.0, 2.0, 3.0, 4.0], 99)
+    4.0
+    >>> percentile([], 50)
+    0.0
+    """
+    if not sorted_values:
+        return 0.0
+
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def _file_entry(result: "FileResult") -> Dict[str, Any]:
+    return {
+        "filename": result.filename,
+        "outcome": result.outcome.name.lower(),
+        "changed": result.changed,
+        "cached": result.cached,
+        "error": result.error,
+        "size": result.size,
+        "timings": dict(result.timings._asdict(), total=result.timings.total),
+    }
+
+
+def build_report(
+    results: Sequence["FileResult"], wall_time: float, top: int = 20
+) -> Dict[str, Any]:
+    """
+    A machine readable report of a run: per file phase timings, aggregate
+    percentiles per phase and the `top` slowest files.
+    """
+    total_size = sum(result.size for result in results)
+    phases: List[str] = ["read", "parse", "transform", "codegen", "write", "total"]
+    phase_timings = {
+        phase: sorted(getattr(result.timings, phase) for result in results)
+        for phase in phases
+    }
+    slowest = sorted(results, key=lambda result: result.timings.total, reverse=True)
+
+    return {
+        "summary": {
+            "files": len(results),
+            "bytes": total_size,
+            "wall_time": wall_time,
+            "files_per_second": len(results) / wall_time if wall_time else 0.0,
+            "bytes_per_second": total_size / wall_time if wall_time else 0.0,
+            "outcomes": dict(
+                Counter(result.outcome.name.lower() for result in results)
+            ),
+        },
+        "percentiles": {
+            phase: dict(
+                {
+                    "p{}".format(percent): percentile(timings, percent)
+                    for percent in PERCENTILES
+                },
+                max=timings[-1] if timings else 0.0,
+                sum=sum(timings),
+            )
+            for phase, timings in phase_timings.items()
+        },
+        "slowest": [_file_entry(result) for result in slowest[:top]],
+        "files": [_file_entry(result) for result in results],
+    }
+
+
+def write_report(filename: str, report: Dict[str, Any]) -> None:
+    with open(filename, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+        report_file.write("\n")
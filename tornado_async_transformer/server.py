@@ -0,0 +1,474 @@
+"""
+A long-running HTTP service for transforming sources, e.g. for a migration
+dashboard.
+
+    python -m tornado_async_transformer.server --port 8000
+
+Requests are accepted on a thread per connection and transformed in a pool of
+warm worker processes. Identical sources are answered from an LRU cache.
+
+    POST /transform {"source": "..."}
+    -> {"source": "...", "changed": true, "error": null}
+
+Many sources can be sent in one request as newline delimited json records.
+Results are streamed back as each one finishes, so not in request order.
+
+    POST /batch {"id": 1, "source": "..."}\n{"id": 2, "source": "..."}\n...
+    -> {"id": 2, "source": "...", "changed": false, "error": null}\n...
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import signal
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+import libcst as cst
+
+from tornado_async_transformer import TornadoAsyncTransformer
+from tornado_async_transformer.tool import find_trigger_names, positive_int
+
+Response = Dict[str, Any]
+
+
+class CPUTimeLimitExceeded(Exception):
+    """
+    Raised inside of a worker when transforming a source takes more CPU time
+    than a request is allowed.
+    """
+
+
+def _error(exception: BaseException) -> Dict[str, str]:
+    return {"type": type(exception).__name__, "message": str(exception)}
+
+
+def transform_source_with_limit(
+    source: str, cpu_time_limit: Optional[float] = None
+) -> Response:
+    """
+    Transforms `source`, failing with a CPUTimeLimitExceeded error if that takes
+    more than `cpu_time_limit` seconds of CPU time. The limit is enforced with
+    a SIGPROF timer, so it's only available on unix and must run on the main
+    thread of a process: in pool workers, that's where jobs are run.
+    """
+    names = find_trigger_names(source.encode())
+    if not names:
+        return {"source": source, "changed": False, "error": None}
+
+    # the timer's exception is raised inside of whatever libcst is running at
+    # the time, and libcst's parser wraps exceptions in its own, so whether the
+    # timer went off is tracked separately from what comes out of the parser
+    timed_out: List[bool] = []
+
+    def on_timer(signum: int, frame: object) -> None:
+        timed_out.append(True)
+        raise CPUTimeLimitExceeded("transforming took too much cpu time")
+
+    use_timer = cpu_time_limit is not None and hasattr(signal, "setitimer")
+    previous_handler: Any = None
+    if use_timer:
+        previous_handler = signal.signal(signal.SIGPROF, on_timer)
+        signal.setitimer(signal.ITIMER_PROF, cpu_time_limit)
+
+    error: Optional[Exception] = None
+    try:
+        transformer = TornadoAsyncTransformer(possible_trigger_names=names)
+        transformed = cst.parse_module(source).visit(transformer).code
+    except Exception as e:
+        error = e
+    finally:
+        if use_timer:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous_handler)
+
+    if timed_out:
+        error = CPUTimeLimitExceeded("transforming took too much cpu time")
+    if error is not None:
+        return {"source": source, "changed": False, "error": _error(error)}
+    return {"source": transformed, "changed": transformer.modified, "error": None}
+
+
+class LRUCache:
+    """
+    A thread safe, size bounded cache of responses keyed by a hash of the
+    source they're for.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Response]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(source: str) -> str:
+        return hashlib.sha256(source.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Response]:
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None:
+                self._entries.move_to_end(key)
+            return response
+
+    def put(self, key: str, response: Response) -> None:
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class TransformService:
+    """
+    Transforms sources in a pool of worker processes that are started (and
+    have libcst imported) up front. A worker that dies takes the pool down
+    with it, so a broken pool is replaced once before giving up on a request.
+    """
+
+    def __init__(
+        self, workers: int, cache_size: int, cpu_time_limit: Optional[float]
+    ) -> None:
+        self.workers = workers
+        self.cpu_time_limit = cpu_time_limit
+        self.cache = LRUCache(cache_size)
+        self._lock = threading.Lock()
+        self._executor = self._start_executor()
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        # warm every worker up, so the first requests don't pay for starting
+        # processes and importing libcst.
+        warm_ups = [
+            executor.submit(
+                transform_source_with_limit, "@gen.coroutine\ndef f(): pass"
+            )
+            for _ in range(self.workers)
+        ]
+        for warm_up in warm_ups:
+            warm_up.result()
+        return executor
+
+    def _submit(self, source: str) -> "Future[Response]":
+        with self._lock:
+            executor = self._executor
+        try:
+            return executor.submit(
+                transform_source_with_limit, source, self.cpu_time_limit
+            )
+        except BrokenProcessPool:
+            self._replace_broken_executor(executor)
+            with self._lock:
+                executor = self._executor
+            return executor.submit(
+                transform_source_with_limit, source, self.cpu_time_limit
+            )
+
+    def _replace_broken_executor(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False)
+                self._executor = self._start_executor()
+
+    def submit(self, source: str) -> "Future[Response]":
+        """
+        Starts transforming `source`, returning a future of its response. Cache
+        hits are returned as already completed futures. Only responses without
+        an error are cached, since e.g. going over the CPU time limit depends on
+        how busy the machine was.
+        """
+        key = self.cache.key(source)
+        cached = self.cache.get(key)
+        if cached is not None:
+            future: "Future[Response]" = Future()
+            future.set_result(cached)
+            return future
+
+        def on_done(done: "Future[Response]") -> None:
+            if (
+                not done.cancelled()
+                and done.exception() is None
+                and done.result()["error"] is None
+            ):
+                self.cache.put(key, done.result())
+
+        future = self._submit(source)
+        future.add_done_callback(on_done)
+        return future
+
+    def result(self, future: "Future[Response]", source: str) -> Response:
+        """
+        Waits for the response to a submitted `source`. If its worker died, the
+        pool is replaced and the death is reported as the source's error.
+        """
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            with self._lock:
+                executor = self._executor
+            self._replace_broken_executor(executor)
+            return {"source": source, "changed": False, "error": _error(e)}
+
+    def transform(self, source: str) -> Response:
+        return self.result(self.submit(source), source)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown()
+
+
+def _invalid_record(record_id: Any, message: str) -> Dict[str, Any]:
+    return {
+        "id": record_id,
+        "source": None,
+        "changed": False,
+        "error": {"type": "InvalidRecord", "message": message},
+    }
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def make_handler(
+    service: TransformService, max_request_bytes: int
+) -> Callable[..., BaseHTTPRequestHandler]:
+    class TransformHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            if self.path != "/healthz":
+                self.send_json(404, {"error": "not found"})
+                return
+            self.send_json(200, {"status": "ok"})
+
+        def do_POST(self) -> None:
+            if self.path == "/batch":
+                self.transform_batch()
+                return
+
+            if self.path not in ("/transform", "/api/transform"):
+                self.send_json(404, {"error": "not found"})
+                return
+
+            request = self.read_json_body()
+            if request is None:
+                return
+
+            source = request.get("source") if isinstance(request, dict) else None
+            if not isinstance(source, str):
+                self.send_json(400, {"error": "expected a json object with a source"})
+                return
+
+            self.send_json(200, service.transform(source))
+
+        def read_json_body(self) -> Optional[Any]:
+            """
+            Reads the request's json body, enforcing the size limit. Responds
+            with an error and returns None if the body can't be read.
+            """
+            content_length = self.headers.get("Content-Length")
+            if content_length is None or not content_length.isdigit():
+                self.send_json(411, {"error": "a content length is required"})
+                return None
+
+            if int(content_length) > max_request_bytes:
+                self.send_json(
+                    413,
+                    {
+                        "error": "request body is larger than {} bytes".format(
+                            max_request_bytes
+                        )
+                    },
+                )
+                self.close_connection = True
+                return None
+
+            try:
+                return json.loads(self.rfile.read(int(content_length)).decode())
+            except ValueError:
+                self.send_json(400, {"error": "request body is not valid json"})
+                return None
+
+        def transform_batch(self) -> None:
+            """
+            Transforms a stream of newline delimited {id, source} records,
+            streaming back {id, source, changed, error} records as they finish.
+            Only a bounded number of records are in flight at once, so neither
+            the request nor the response is ever held in memory in full.
+            """
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            max_in_flight = service.workers * 4
+            in_flight: Dict["Future[Response]", Any] = {}
+
+            def write_finished(block: bool) -> None:
+                done, _ = wait(
+                    list(in_flight),
+                    timeout=None if block else 0,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    record_id, source = in_flight.pop(future)
+                    self.write_record(
+                        dict(service.result(future, source), id=record_id)
+                    )
+
+            for line in self.read_body_lines():
+                if line is not None and not line.strip():
+                    continue
+
+                record = self.parse_record(line)
+                if "error" in record:
+                    self.write_record(record)
+                else:
+                    future = service.submit(record["source"])
+                    in_flight[future] = (record["id"], record["source"])
+
+                write_finished(block=len(in_flight) >= max_in_flight)
+
+            while in_flight:
+                write_finished(block=True)
+
+            self.wfile.write(b"0\r\n\r\n")
+
+        @staticmethod
+        def parse_record(line: Optional[bytes]) -> Dict[str, Any]:
+            if line is None:
+                message = "record is larger than {} bytes".format(max_request_bytes)
+                return _invalid_record(None, message)
+
+            try:
+                record = json.loads(line.decode())
+            except ValueError:
+                return _invalid_record(None, "record is not valid json")
+
+            if not isinstance(record, dict) or not isinstance(
+                record.get("source"), str
+            ):
+                record_id = record.get("id") if isinstance(record, dict) else None
+                return _invalid_record(record_id, "expected an object with a source")
+
+            return {"id": record.get("id"), "source": record["source"]}
+
+        def read_body_lines(self) -> Iterator[Optional[bytes]]:
+            """
+            Lazily splits the request body into lines. A line longer than the
+            request size limit is skipped and yielded as None.
+            """
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                chunks = self.read_chunked_body()
+            else:
+                chunks = self.read_sized_body()
+
+            buffer = b""
+            oversized = False
+            for chunk in chunks:
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    yield None if oversized else line
+                    oversized = False
+
+                if len(buffer) > max_request_bytes:
+                    buffer = b""
+                    oversized = True
+
+            if buffer or oversized:
+                yield None if oversized else buffer
+
+        def read_sized_body(self) -> Iterator[bytes]:
+            remaining = int(self.headers.get("Content-Length") or 0)
+            while remaining > 0:
+                chunk = self.rfile.read(min(remaining, 64 * 1024))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+        def read_chunked_body(self) -> Iterator[bytes]:
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    # skip any trailers up to the final empty line
+                    while self.rfile.readline().strip():
+                        pass
+                    return
+                yield self.rfile.read(size)
+                self.rfile.readline()
+
+        def write_record(self, record: Dict[str, Any]) -> None:
+            encoded = json.dumps(record).encode() + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(encoded), encoded))
+            self.wfile.flush()
+
+        def send_json(self, status: int, body: Any) -> None:
+            encoded = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+
+    return TransformHandler
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=4096,
+        help="Number of responses to keep in the LRU cache (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--max-request-bytes",
+        type=positive_int,
+        default=2 * 1024 * 1024,
+        help="Largest accepted request body (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--cpu-time-limit",
+        type=float,
+        default=10.0,
+        help="CPU seconds a single transform may take (default: %(default)s).",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    service = TransformService(args.workers, args.cache_size, args.cpu_time_limit)
+    server = ThreadingHTTPServer(
+        (args.host, args.port), make_handler(service, args.max_request_bytes)
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Running tasks in worker processes that are each held to a time and memory
+budget. A worker that goes over budget on a task is killed and replaced, and
+the task is reported as a failure instead of holding up (or taking down) the
+rest of the run.
+"""
+
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# how often the memory of busy workers is checked, in seconds
+POLL_INTERVAL = 0.05
+
+
+class WorkerFailure(NamedTuple):
+    """
+    Why the task for `item` didn't produce a result. `over_budget` is set if
+    the worker was killed for going over its budget, rather than dying on its
+    own.
+    """
+
+    item: Any
+    reason: str
+    over_budget: bool
+
+
+def rss_supported() -> bool:
+    return os.path.exists("/proc/self/statm")
+
+
+def _rss(pid: int) -> Optional[int]:
+    """
+    The resident set size of process `pid` in bytes, read from /proc.
+    """
+    try:
+        with open("/proc/{}/statm".format(pid), "rb") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def _work(
+    function: Callable[[T], R], connection: multiprocessing.connection.Connection
+) -> None:
+    while True:
+        try:
+            task = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if task is None:
+            return
+        index, item = task
+        connection.send((index, function(item)))
+
+
+class _Worker(Generic[T, R]):
+    def __init__(self, function: Callable[[T], R]) -> None:
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_work, args=(function, child_connection), daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+        self.task: Optional[Tuple[int, T]] = None
+        self.started = 0.0
+
+    def start(self, index: int, item: T) -> None:
+        self.task = (index, item)
+        self.started = time.monotonic()
+        self.connection.send(self.task)
+
+    def kill(self) -> None:
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+    def stop(self) -> None:
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.connection.close()
+
+
+def supervised_map(
+    function: Callable[[T], R],
+    items: Iterable[T],
+    jobs: int = 1,
+    timeout: Optional[float] = None,
+    max_rss: Optional[int] = None,
+) -> Iterator[Union[R, WorkerFailure]]:
+    """
+    Like `Pool.imap(function, items)`, but each call runs in a worker that's
+    killed and replaced if it takes longer than `timeout` seconds or its
+    resident memory grows past `max_rss` bytes. Such calls, and calls whose
+    worker died, yield a WorkerFailure instead of a result.
+
+    Results are yielded in the same order as `items`. Workers are handed one
+    item at a time, so that every item gets the whole budget to itself.
+    """
+    workers: List[_Worker] = [_Worker(function) for _ in range(jobs)]
+    pending = enumerate(items)
+    results: Dict[int, Union[R, WorkerFailure]] = {}
+    next_index = 0
+    exhausted = False
+
+    def replace(worker: _Worker, reason: str, over_budget: bool) -> _Worker:
+        assert worker.task is not None
+        index, item = worker.task
+        results[index] = WorkerFailure(item, reason, over_budget)
+        worker.kill()
+        return _Worker(function)
+
+    try:
+        while True:
+            for worker in workers:
+                if worker.task is None and not exhausted:
+                    task = next(pending, None)
+                    if task is None:
+                        exhausted = True
+                    else:
+                        worker.start(*task)
+
+            busy = [worker for worker in workers if worker.task is not None]
+            if not busy:
+                break
+
+            wait_for = POLL_INTERVAL if max_rss is not None else None
+            if timeout is not None:
+                now = time.monotonic()
+                until_deadline = max(
+                    0.0, min(worker.started + timeout - now for worker in busy)
+                )
+                wait_for = (
+                    until_deadline
+                    if wait_for is None
+                    else min(wait_for, until_deadline)
+                )
+
+            ready = multiprocessing.connection.wait(
+                [worker.connection for worker in busy], timeout=wait_for
+            )
+            for index, worker in enumerate(workers):
+                if worker.task is None:
+                    continue
+
+                if worker.connection in ready:
+                    try:
+                        task_index, result = worker.connection.recv()
+                    except (EOFError, OSError):
+                        worker.process.join()
+                        workers[index] = replace(
+                            worker,
+                            "worker died with exit code {}".format(
+                                worker.process.exitcode
+                            ),
+                            over_budget=False,
+                        )
+                        continue
+                    results[task_index] = result
+                    worker.task = None
+                    continue
+
+                if timeout is not None and time.monotonic() - worker.started > timeout:
+                    workers[index] = replace(
+                        worker,
+                        "took longer than {:g}s".format(timeout),
+                        over_budget=True,
+                    )
+                    continue
+
+                if max_rss is not None:
+                    rss = _rss(worker.process.pid)
+                    if rss is not None and rss > max_rss:
+                        workers[index] = replace(
+                            worker,
+                            "used more than {} MiB of memory".format(
+                                max_rss // (1024 * 1024)
+                            ),
+                            over_budget=True,
+                        )
+
+            while next_index in results:
+                yield results.pop(next_index)
+                next_index += 1
+    finally:
+        for worker in workers:
+            if worker.task is None:
+                worker.stop()
+            else:
+                worker.kill()
@@ -1,60 +1,476 @@
+import argparse
+import multiprocessing
+import multiprocessing.pool
 import os
 import re
 import sys
+import time
+from collections import Counter
+from enum import Enum
+from functools import partial
+from itertools import chain
 from pathlib import Path
-from typing import List, Tuple
-import argparse
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
+
+from tornado_async_transformer.cache import CacheEntry, ResultCache, default_cache_dir
+from tornado_async_transformer.discovery import GitError, collect_files, git_files
+from tornado_async_transformer.journal import Journal
+from tornado_async_transformer.names import trigger_names
+from tornado_async_transformer.patch import unified_diff
+from tornado_async_transformer.pipeline import Pipeline, SourceFile
+from tornado_async_transformer.report import build_report, write_report
+from tornado_async_transformer.supervisor import (
+    WorkerFailure,
+    rss_supported,
+    supervised_map,
+)
+
+# libcst, and everything built on it, is only imported once a file makes it past
+# the pre-scan, see `transform_file`
+if TYPE_CHECKING:
+    from libcst import CSTVisitorT
+
+# matches any of the names the transformer's matchers could hit, see `might_transform`.
+trigger_names_pattern = re.compile(
+    rb"\b(?:"
+    + b"|".join(re.escape(name.encode()) for name in sorted(trigger_names))
+    + rb")\b"
+)
+
+
+class Outcome(Enum):
+    """
+    The stage at which processing a file stopped. The values are used when
+    reporting on a run.
+    """
+
+    SKIPPED = "skipped by pre-scan"
+    PARSE_FAILED = "failed parse"
+    TRANSFORM_FAILED = "failed transform"
+    FAILED = "failed"
+    OVER_BUDGET = "skipped over budget"
+    UNCHANGED = "unchanged"
+    CHANGED = "changed"
+
+
+# outcomes that fail a --check run: files that would change, can't be
+# transformed, or couldn't be checked at all
+CHECK_FAILURES = (
+    Outcome.CHANGED,
+    Outcome.TRANSFORM_FAILED,
+    Outcome.FAILED,
+    Outcome.OVER_BUDGET,
+)
+
+# the default cap on the size of the files that have been read, but whose
+# results haven't been written and handed back yet
+DEFAULT_MAX_BYTES_IN_FLIGHT = 64 * 1024 * 1024
+
+
+class Timings(NamedTuple):
+    """
+    Seconds spent in each phase of processing a file. Phases that were never
+    reached are left at zero.
+    """
+
+    read: float = 0.0
+    parse: float = 0.0
+    transform: float = 0.0
+    codegen: float = 0.0
+    write: float = 0.0
+
+    @property
+    def total(self) -> float:
+        return sum(self)
+
+
+class FileResult(NamedTuple):
+    """
+    The outcome of transforming a single file. `error` is a human readable
+    description of why the file couldn't be transformed, if it couldn't be.
+    """
+
+    filename: str
+    outcome: Outcome
+    error: Optional[str] = None
+    cached: bool = False
+    size: int = 0
+    timings: Timings = Timings()
+    # a unified diff of the change to the file, if one was asked for
+    diff: Optional[str] = None
+    # the file's transformed code, if it changed and the code was asked for
+    code: Optional[str] = None
+
+    @property
+    def changed(self) -> bool:
+        return self.outcome is Outcome.CHANGED
+
+
+def might_transform(source: bytes) -> bool:
+    """
+    A cheap textual check that's much faster than parsing a module. If this
+    returns False, the transformer is guaranteed to leave the module untouched.
+
+    >>> might_transform(b"@gen.coroutine\\ndef f(): pass")
+    True
+    >>> might_transform(b"def coroutines(): pass")
+    False
+    """
+    return trigger_names_pattern.search(source) is not None
+
+
+def find_trigger_names(source: bytes) -> FrozenSet[str]:
+    """
+    Which of the transformer's trigger names appear in `source`.
+
+    >>> sorted(find_trigger_names(b"@gen.coroutine\\ndef f(): yield gen.Task(g)"))
+    ['Task', 'coroutine']
+    """
+    return frozenset(name.decode() for name in trigger_names_pattern.findall(source))
+
+
+def transform_file(
+    visitor: "CSTVisitorT",
+    filename: str,
+    cache: Optional[ResultCache] = None,
+    write: bool = True,
+    diff: bool = False,
+    check: bool = False,
+    keep_code: bool = False,
+    chunk_lines: Optional[int] = None,
+    source: Optional[bytes] = None,
+) -> FileResult:
+    """
+    Transforms a single file with `visitor`. Changes are written back to the
+    file if `write` is set, returned as a unified diff if `diff` is set and
+    returned as the file's new code if `keep_code` is set. The file is read
+    unless its `source` is passed in.
 
-import libcst as cst
-from libcst import CSTVisitorT
+    If `check` is set, the file is only checked for whether it would change:
+    with a TornadoAsyncTransformer, the check stops at the first coroutine and
+    no code is generated.
 
-from tornado_async_transformer import TornadoAsyncTransformer, TransformError
+    The pre-scan and `cache` only apply to TornadoAsyncTransformers, since
+    other visitors (including a CompositeTransformer running one) may change
+    files the pre-scan would skip.
 
+    Visitors that declare metadata dependencies visit the module through a
+    `libcst.MetadataWrapper`, which is only built once the file has made it
+    past the pre-scan and the cache.
 
-def transform_file(visitor: CSTVisitorT, filename: str) -> None:
-    with open(filename, "r") as python_file:
-        python_source = python_file.read()
+    Modules of at least `chunk_lines` lines are split into top-level statements
+    with `ast`, and only the statements that could change are parsed and
+    transformed with libcst. This doesn't apply to visitors other than
+    TornadoAsyncTransformer or to ones that need metadata, which need to see
+    the whole module.
+    """
+    import libcst as cst
+
+    from tornado_async_transformer.chunked import ChunkedModule
+    from tornado_async_transformer.tornado_async_transformer import (
+        TornadoAsyncTransformer,
+        TransformError,
+    )
+
+    start = time.perf_counter()
+    if source is None:
+        with open(filename, "rb") as python_file:
+            source = python_file.read()
+    timings = Timings(read=time.perf_counter() - start)
+
+    def result(
+        outcome: Outcome,
+        error: Optional[str] = None,
+        cached: bool = False,
+        diff: Optional[str] = None,
+        code: Optional[str] = None,
+    ) -> FileResult:
+        return FileResult(
+            filename, outcome, error, cached, len(source), timings, diff, code
+        )
 
+    if not isinstance(visitor, TornadoAsyncTransformer):
+        cache = None
+    elif not might_transform(source):
+        return result(Outcome.SKIPPED)
+
+    if cache is not None:
+        entry = cache.get(source)
+        if entry is not None:
+            return result(Outcome[entry.outcome], entry.error, cached=True)
+
+    if isinstance(visitor, TornadoAsyncTransformer):
+        visitor.possible_trigger_names = find_trigger_names(source)
+
+    start = time.perf_counter()
     try:
-        source_tree = cst.parse_module(python_source)
+        python_source = source.decode("utf-8")
+        if (
+            chunk_lines is not None
+            and isinstance(visitor, TornadoAsyncTransformer)
+            and not visitor.get_inherited_dependencies()
+            and source.count(b"\n") >= chunk_lines
+        ):
+            source_tree = ChunkedModule.parse(python_source)
+        else:
+            source_tree = cst.parse_module(python_source)
     except Exception as e:
-        print("{} failed parse: {}".format(filename, str(e)))
-        return
+        timings = timings._replace(parse=time.perf_counter() - start)
+        return result(Outcome.PARSE_FAILED, str(e))
+    timings = timings._replace(parse=time.perf_counter() - start)
 
+    start = time.perf_counter()
     try:
-        visited_tree = source_tree.visit(visitor)
+        tree = source_tree
+        if visitor.get_inherited_dependencies():
+            # nothing else holds on to the freshly parsed module, so there's no
+            # need for the wrapper to copy it
+            tree = cst.MetadataWrapper(source_tree, unsafe_skip_copy=True)
+
+        if check and isinstance(visitor, TornadoAsyncTransformer):
+            would_change = visitor.check(tree)
+            timings = timings._replace(transform=time.perf_counter() - start)
+            if would_change:
+                return result(Outcome.CHANGED)
+            if cache is not None:
+                cache.put(source, CacheEntry(Outcome.UNCHANGED.name))
+            return result(Outcome.UNCHANGED)
+
+        visited_tree = tree.visit(visitor)
     except TransformError as e:
-        print("{} failed transform: {}".format(filename, str(e)))
+        timings = timings._replace(transform=time.perf_counter() - start)
+        if cache is not None:
+            cache.put(source, CacheEntry(Outcome.TRANSFORM_FAILED.name, str(e)))
+        return result(Outcome.TRANSFORM_FAILED, str(e))
+    timings = timings._replace(transform=time.perf_counter() - start)
+
+    if isinstance(visitor, TornadoAsyncTransformer):
+        # the transformer tracks its own changes, sparing us a second walk of
+        # both trees to compare them.
+        modified = visitor.modified
+    else:
+        modified = not visited_tree.deep_equals(source_tree)
+    # let the source tree go before generating code from the visited one
+    del source_tree, tree
+
+    if not modified:
+        if cache is not None:
+            cache.put(source, CacheEntry(Outcome.UNCHANGED.name))
+        return result(Outcome.UNCHANGED)
+
+    start = time.perf_counter()
+    code = visited_tree.code
+    timings = timings._replace(codegen=time.perf_counter() - start)
+
+    if check:
+        return result(Outcome.CHANGED)
+
+    start = time.perf_counter()
+    if write:
+        with open(filename, "w", encoding="utf-8") as python_file:
+            python_file.write(code)
+    patch = unified_diff(filename, python_source, code) if diff else None
+    timings = timings._replace(write=time.perf_counter() - start)
+
+    return result(Outcome.CHANGED, diff=patch, code=code if keep_code else None)
+
+
+def _transform_file_with_fresh_transformer(
+    source_file: SourceFile,
+    cache: Optional[ResultCache] = None,
+    write: bool = True,
+    diff: bool = False,
+    check: bool = False,
+    resolve_imports: bool = False,
+    keep_code: bool = False,
+    chunk_lines: Optional[int] = None,
+) -> FileResult:
+    # files the pre-scan rules out are skipped before building a transformer,
+    # which would import libcst
+    if source_file.source is not None and not might_transform(source_file.source):
+        return FileResult(
+            source_file.filename,
+            Outcome.SKIPPED,
+            size=len(source_file.source),
+            timings=Timings(read=source_file.read_time),
+        )
+
+    from tornado_async_transformer.import_aware import (
+        ImportAwareTornadoAsyncTransformer,
+    )
+    from tornado_async_transformer.tornado_async_transformer import (
+        TornadoAsyncTransformer,
+    )
+
+    transformer = (
+        ImportAwareTornadoAsyncTransformer()
+        if resolve_imports
+        else TornadoAsyncTransformer()
+    )
+    # This runs inside of pool workers, so any unexpected error has to be
+    # captured here to be reported against the file instead of killing the run.
+    try:
+        result = transform_file(
+            transformer,
+            source_file.filename,
+            cache,
+            write,
+            diff,
+            check,
+            keep_code,
+            chunk_lines,
+            source_file.source,
+        )
+    except Exception as e:
+        return FileResult(source_file.filename, Outcome.FAILED, repr(e))
+    return result._replace(
+        timings=result.timings._replace(
+            read=result.timings.read + source_file.read_time
+        )
+    )
+
+
+def _write_result(result: FileResult, write: bool, keep_code: bool) -> FileResult:
+    """
+    Writes a changed file's code back, in the pipeline's writing stage, and
+    drops the code from its result unless it was asked for.
+    """
+    if not (write and result.changed and result.code is not None):
+        return result if keep_code else result._replace(code=None)
+
+    start = time.perf_counter()
+    try:
+        with open(result.filename, "w", encoding="utf-8") as python_file:
+            python_file.write(result.code)
+    except Exception as e:
+        return result._replace(outcome=Outcome.FAILED, error=repr(e), code=None)
+    timings = result.timings._replace(
+        write=result.timings.write + time.perf_counter() - start
+    )
+    return result._replace(timings=timings, code=result.code if keep_code else None)
+
+
+def _map_source_files(
+    transform: Callable[[SourceFile], FileResult],
+    source_files: Iterator[SourceFile],
+    jobs: int,
+    pool: Optional[multiprocessing.pool.Pool],
+    file_timeout: Optional[float],
+    file_max_rss: Optional[int],
+) -> Iterator[FileResult]:
+    if file_timeout is not None or file_max_rss is not None:
+        for result in supervised_map(
+            transform, source_files, jobs, file_timeout, file_max_rss
+        ):
+            if isinstance(result, WorkerFailure):
+                outcome = Outcome.OVER_BUDGET if result.over_budget else Outcome.FAILED
+                result = FileResult(result.item.filename, outcome, result.reason)
+            yield result
         return
 
-    if not visited_tree.deep_equals(source_tree):
-        with open(filename, "w") as python_file:
-            python_file.write(visited_tree.code)
+    # files are handed to workers one at a time: the cap on bytes in flight
+    # might not leave room for a whole chunk of them.
+    if pool is not None:
+        yield from pool.imap(transform, source_files)
+        return
+
+    if jobs <= 1:
+        yield from map(transform, source_files)
+        return
+
+    # workers are long-lived: libcst is imported once per worker, for the first
+    # file that needs it, and reused for every file that worker is handed after.
+    with multiprocessing.Pool(processes=jobs) as pool:
+        yield from pool.imap(transform, source_files)
 
 
-def collect_files(base: str) -> Tuple[str, ...]:
+def transform_files(
+    filenames: Iterable[str],
+    jobs: int = 1,
+    cache: Optional[ResultCache] = None,
+    write: bool = True,
+    diff: bool = False,
+    check: bool = False,
+    resolve_imports: bool = False,
+    keep_code: bool = False,
+    pool: Optional[multiprocessing.pool.Pool] = None,
+    chunk_lines: Optional[int] = None,
+    file_timeout: Optional[float] = None,
+    file_max_rss: Optional[int] = None,
+    max_bytes_in_flight: int = DEFAULT_MAX_BYTES_IN_FLIGHT,
+) -> Iterator[FileResult]:
     """
-    Collect all python files under a base directory.
+    Transform `filenames`, spread across `jobs` worker processes. Results are
+    yielded in the same order as `filenames` regardless of which worker
+    finishes first, so runs stay deterministic.
+
+    Files are streamed through a pipeline, see `tornado_async_transformer.pipeline`:
+    they're read ahead and written back in threads of their own while workers
+    transform them, and at most `max_bytes_in_flight` bytes of files are held
+    at any time.
+
+    An already running `pool` can be passed in to be used instead, so that
+    repeated runs don't pay for starting workers.
+
+    If `file_timeout` (seconds) or `file_max_rss` (bytes) is given, every file
+    is transformed in a supervised worker instead, which is killed and
+    replaced if it goes over either budget. The file is then reported as
+    skipped over budget, and the run carries on.
+
+    If `resolve_imports` is set, the import aware transformer is used: it's
+    slower, but isn't fooled by renamed imports.
     """
+    # workers hand the new code back to be written by the pipeline
+    transform = partial(
+        _transform_file_with_fresh_transformer,
+        cache=cache,
+        write=False,
+        diff=diff,
+        check=check,
+        resolve_imports=resolve_imports,
+        keep_code=keep_code or write,
+        chunk_lines=chunk_lines,
+    )
+    yield from Pipeline(
+        filenames,
+        partial(
+            _map_source_files,
+            transform,
+            jobs=jobs,
+            pool=pool,
+            file_timeout=file_timeout,
+            file_max_rss=file_max_rss,
+        ),
+        partial(_write_result, write=write, keep_code=keep_code),
+        max_bytes_in_flight,
+    )
 
-    def is_python_file(path: str) -> bool:
-        return bool(os.path.isfile(path) and re.search(r"\.pyi?$", path))
 
-    if is_python_file(base):
-        return (base,)
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(
+            "expected a positive integer, got {}".format(value)
+        )
+    return number
 
-    if os.path.isdir(base):
-        python_files: List[str] = []
-        for root, dirs, filenames in os.walk(base):
-            full_filenames = (f"{root}/{filename}" for filename in filenames)
-            python_files += [
-                full_filename
-                for full_filename in full_filenames
-                if is_python_file(full_filename)
-            ]
-        return tuple(python_files)
 
-    return tuple()
+def positive_float(value: str) -> float:
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(
+            "expected a positive number, got {}".format(value)
+        )
+    return number
 
 
 def parse_args() -> argparse.Namespace:
@@ -67,18 +483,299 @@ def parse_args() -> argparse.Namespace:
         nargs="+",
         help="Files and directories (recursive) including python files to be modified.",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes to transform files with (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--exclude",
+        type=str,
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Skip files and directories whose name or path relative to a base matches GLOB. Can be given multiple times.",
+    )
+    parser.add_argument(
+        "--no-gitignore",
+        action="store_true",
+        help="Don't skip files and directories ignored by .gitignore files.",
+    )
+    git = parser.add_mutually_exclusive_group()
+    git.add_argument(
+        "--git-tracked",
+        action="store_true",
+        help="Only transform files tracked by git, listed from the git index instead of walking directories.",
+    )
+    git.add_argument(
+        "--since",
+        type=str,
+        metavar="REF",
+        help="Only transform files that have changed since the git revision REF, e.g. `--since origin/master`.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=default_cache_dir(),
+        help="Directory to cache the outcome of unchanged and unsupported files in (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither read from nor write to the cache.",
+    )
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
+        "--check",
+        action="store_true",
+        help="Don't modify files, exit with status 1 if any file would be transformed or can't be transformed.",
+    )
+    output.add_argument(
+        "--diff",
+        action="store_true",
+        help="Don't modify files, print a unified diff of the changes to stdout instead.",
+    )
+    output.add_argument(
+        "--patch-out",
+        type=str,
+        metavar="FILE",
+        help="Don't modify files, write a patch of the changes to FILE instead. Apply it with `git apply FILE`.",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="With --check, stop at the first file that would be transformed or can't be transformed.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After transforming, keep watching the files and re-transform each one as it changes, e.g. while fixing files that couldn't be transformed.",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="With --watch, poll for changes instead of using inotify.",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.2,
+        metavar="SECONDS",
+        help="With --watch, wait until no files have changed for SECONDS before re-transforming (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--resolve-imports",
+        action="store_true",
+        help="Resolve what decorators and calls refer to through each module's imports, instead of going by how they're spelled. Slower, but handles renamed imports like `from tornado import gen as g`.",
+    )
+    parser.add_argument(
+        "--chunk-lines",
+        type=positive_int,
+        metavar="N",
+        help="Split modules of at least N lines into top-level statements and only parse and transform the ones that could change. Much faster on very large modules with few coroutines. Ignored with --resolve-imports.",
+    )
+    parser.add_argument(
+        "--file-timeout",
+        type=positive_float,
+        metavar="SECONDS",
+        help="Give up on, and skip, any file that takes longer than SECONDS to transform. Files are transformed in workers that are killed and replaced when they go over budget.",
+    )
+    parser.add_argument(
+        "--file-max-rss",
+        type=positive_int,
+        metavar="MIB",
+        help="Give up on, and skip, any file whose worker's resident memory grows past MIB megabytes while transforming it. Only supported on linux.",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=positive_int,
+        default=DEFAULT_MAX_BYTES_IN_FLIGHT // (1024 * 1024),
+        metavar="MIB",
+        help="Cap the total size of the files that have been read but not yet transformed and written back at MIB megabytes, which keeps memory use flat however many files there are (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--journal",
+        type=str,
+        metavar="FILE",
+        help="Record each finished file in FILE, and skip the files already recorded there, so an interrupted run can be resumed by running it again with the same journal.",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        metavar="FILE",
+        help="Write a JSON report with per file phase timings, percentiles and the slowest files to FILE.",
+    )
+    parser.add_argument(
+        "--report-top",
+        type=positive_int,
+        default=20,
+        metavar="N",
+        help="Number of slowest files to list in the report (default: %(default)s).",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
+    if args.fail_fast and not args.check:
+        sys.exit("--fail-fast can only be used with --check")
+    if args.watch and (args.check or args.diff or args.patch_out or args.report):
+        sys.exit("--watch can't be used with --check, --diff, --patch-out or --report")
+    if args.watch and (args.git_tracked or args.since):
+        sys.exit("--watch can't be used with --git-tracked or --since")
+    if args.journal and (args.check or args.diff or args.patch_out or args.watch):
+        sys.exit("--journal can't be used with --check, --diff, --patch-out or --watch")
+    if args.file_max_rss is not None and not rss_supported():
+        sys.exit("--file-max-rss is only supported on linux")
+
+    if args.git_tracked or args.since:
+        # listed up front, so git errors are reported before anything is transformed
+        try:
+            python_files: Iterable[str] = list(
+                git_files(args.bases, args.since, args.exclude)
+            )
+        except GitError as e:
+            sys.exit("couldn't list files with git: {}".format(e))
+    else:
+        # discovery is lazy, so transforming starts as soon as the first file is found
+        python_files = chain.from_iterable(
+            collect_files(base, args.exclude, use_gitignore=not args.no_gitignore)
+            for base in args.bases
+        )
 
-    python_files: List[str] = []
-    for base in args.bases:
-        python_files += collect_files(base)
+    cache = (
+        None
+        if args.no_cache
+        else ResultCache(
+            args.cache_dir, mode="resolve-imports" if args.resolve_imports else ""
+        )
+    )
 
-    for python_file in python_files:
-        transform_file(TornadoAsyncTransformer(), python_file)
+    if args.watch:
+        watch_files(args, cache)
+        return
+
+    journal = Journal(args.journal) if args.journal else None
+    if journal is not None:
+        python_files = journal.pending(python_files)
+
+    diff = args.diff or args.patch_out is not None
+    write = not (diff or args.check)
+    offending = 0
+    # keep the diff on stdout clean enough to pipe into `git apply`
+    error_output = sys.stderr if args.diff else sys.stdout
+    patch_output = open(args.patch_out, "w") if args.patch_out else sys.stdout
+
+    start = time.perf_counter()
+    outcomes: Counter = Counter()
+    cache_hits = 0
+    results: List[FileResult] = []
+    try:
+        for result in transform_files(
+            python_files,
+            jobs=args.jobs,
+            cache=cache,
+            write=write,
+            diff=diff,
+            check=args.check,
+            resolve_imports=args.resolve_imports,
+            chunk_lines=args.chunk_lines,
+            file_timeout=args.file_timeout,
+            file_max_rss=(
+                args.file_max_rss * 1024 * 1024
+                if args.file_max_rss is not None
+                else None
+            ),
+            max_bytes_in_flight=args.max_in_flight * 1024 * 1024,
+        ):
+            outcomes[result.outcome] += 1
+            cache_hits += result.cached
+            if journal is not None:
+                journal.record(result.filename, result.outcome.name, result.error)
+            if args.report:
+                results.append(result._replace(diff=None))
+            if result.diff:
+                patch_output.write(result.diff)
+            if result.error is not None:
+                print(
+                    "{} {}: {}".format(
+                        result.filename, result.outcome.value, result.error
+                    ),
+                    file=error_output,
+                )
+            if args.check and result.outcome in CHECK_FAILURES:
+                offending += 1
+                if result.changed:
+                    print("{} would be transformed".format(result.filename))
+                if args.fail_fast:
+                    break
+    finally:
+        if args.patch_out:
+            patch_output.close()
+        if journal is not None:
+            journal.close()
+
+    print(summarize(outcomes, cache_hits), file=sys.stderr)
+    if journal is not None and journal.skipped:
+        print(
+            "{} files already done according to {}".format(
+                journal.skipped, args.journal
+            ),
+            file=sys.stderr,
+        )
+
+    if args.report:
+        wall_time = time.perf_counter() - start
+        write_report(args.report, build_report(results, wall_time, args.report_top))
+
+    if offending:
+        sys.exit(1)
+
+
+def watch_files(args: argparse.Namespace, cache: Optional[ResultCache]) -> None:
+    # imported here, as watching imports this module
+    from tornado_async_transformer.watch import print_runs, watch
+
+    runs = watch(
+        args.bases,
+        args.exclude,
+        use_gitignore=not args.no_gitignore,
+        jobs=args.jobs,
+        cache=cache,
+        resolve_imports=args.resolve_imports,
+        debounce=args.debounce,
+        poll=args.poll,
+        chunk_lines=args.chunk_lines,
+        file_timeout=args.file_timeout,
+        file_max_rss=(
+            args.file_max_rss * 1024 * 1024 if args.file_max_rss is not None else None
+        ),
+        max_bytes_in_flight=args.max_in_flight * 1024 * 1024,
+    )
+    try:
+        print_runs(runs)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runs.close()
+
+
+def summarize(outcomes: Counter, cache_hits: int = 0) -> str:
+    """
+    A one line summary of how many files stopped at each stage of a run.
+
+    >>> summarize(Counter({Outcome.SKIPPED: 8, Outcome.UNCHANGED: 2}), cache_hits=1)
+    '10 files: 8 skipped by pre-scan, 0 failed parse, 0 failed transform, 0 failed, 0 skipped over budget, 2 unchanged, 0 changed (1 from cache)'
+    """
+    return "{} files: {} ({} from cache)".format(
+        sum(outcomes.values()),
+        ", ".join(
+            "{} {}".format(outcomes[outcome], outcome.value) for outcome in Outcome
+        ),
+        cache_hits,
+    )
 
 
 if __name__ == "__main__":
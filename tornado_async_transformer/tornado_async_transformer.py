@@ -1,13 +1,22 @@
-from typing import List, Optional, Set, Tuple, Union
+from typing import AbstractSet, FrozenSet, List, Optional, Set, Tuple, Union
 
 import libcst as cst
 from libcst import matchers as m
 
 from tornado_async_transformer.helpers import (
+    matches_by_terminal_name,
     name_attr_possibilities,
     some_version_of,
     with_added_imports,
 )
+from tornado_async_transformer.names import (
+    coroutine_decorator_names,
+    gen_coroutine_decorator_names,
+    gen_return_names,
+    gen_sleep_names,
+    gen_task_names,
+    trigger_names,
+)
 
 
 # matchers
@@ -34,6 +43,22 @@ coroutine_matcher = m.FunctionDef(
     asynchronous=None,
     decorators=[m.ZeroOrMore(), coroutine_decorator_matcher, m.ZeroOrMore()],
 )
+dict_of_futures_matcher = m.Dict() | m.DictComp() | m.Call(func=m.Name("dict"))
+# dict keys that can be evaluated ahead of the futures without changing what the
+# code does
+simple_dict_key_matcher = m.Name() | m.SimpleString() | m.Integer() | m.Float()
+
+# Nodes that can't contain a function definition, and so can't contain a
+# coroutine. Outside of coroutines their only interest to the transformer is
+# rejecting gen.Task calls.
+coroutine_free_node_types = (
+    cst.BaseExpression,
+    cst.SimpleStatementLine,
+    cst.SimpleStatementSuite,
+    cst.Decorator,
+    cst.Parameters,
+    cst.Annotation,
+)
 
 
 class TransformError(Exception):
@@ -43,6 +68,13 @@ class TransformError(Exception):
     """
 
 
+class _CoroutineFound(Exception):
+    """
+    Raised to stop visiting a module in check mode as soon as a coroutine, which
+    means the module would be changed, is found.
+    """
+
+
 class TornadoAsyncTransformer(cst.CSTTransformer):
     """
     A libcst transformer that replaces the legacy @gen.coroutine/yield
@@ -50,11 +82,68 @@ class TornadoAsyncTransformer(cst.CSTTransformer):
 
     This transformer doesn't remove any tornado imports from modified
     files.
+
+    After visiting a module, `modified` tells whether the transformer changed
+    anything in it, which is much cheaper than comparing the trees.
+
+    If the caller knows which of `trigger_names` appear in the module's source
+    (e.g. from a textual scan), setting them as `possible_trigger_names` before
+    visiting lets the transformer skip every expression and simple statement
+    outside of coroutines when the module can't contain a gen.Task call.
+
+    `check` answers whether a module would be changed much more cheaply than
+    visiting it.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self, possible_trigger_names: Optional[AbstractSet[str]] = None
+    ) -> None:
+        self.possible_trigger_names = possible_trigger_names
+        self.prune_outside_coroutines = False
         self.coroutine_stack: List[bool] = []
+        # for each coroutine on the coroutine stack, the positions of its
+        # decorators to remove, decided once in visit_FunctionDef
+        self.removed_decorators_stack: List[FrozenSet[int]] = []
         self.required_imports: Set[str] = set()
+        self.modified = False
+        self.checking = False
+
+    def check(self, module: cst.Module) -> bool:
+        """
+        Whether visiting `module` would change it, without generating code:
+        the traversal stops at the first coroutine, since only coroutines are
+        ever changed. Like visiting, raises TransformError for unsupported code.
+
+        Unless `possible_trigger_names` rules out gen.Task calls, the module is
+        visited in full, since a gen.Task call after the first coroutine fails
+        the transform as much as one before it.
+        """
+        self.checking = True
+        try:
+            module.visit(self)
+        except _CoroutineFound:
+            return True
+        finally:
+            self.checking = False
+
+        return self.modified
+
+    def on_visit(self, node: cst.CSTNode) -> bool:
+        if (
+            self.prune_outside_coroutines
+            and isinstance(node, coroutine_free_node_types)
+            and not self.in_coroutine(self.coroutine_stack)
+        ):
+            return False
+
+        return super().on_visit(node)
+
+    def visit_Module(self, node: cst.Module) -> Optional[bool]:
+        self.prune_outside_coroutines = (
+            self.possible_trigger_names is not None
+            and not (gen_task_names & self.possible_trigger_names)
+        )
+        return True
 
     def leave_Module(self, node: cst.Module, updated_node: cst.Module) -> cst.Module:
         if not self.required_imports:
@@ -62,13 +151,14 @@ class TornadoAsyncTransformer(cst.CSTTransformer):
 
         imports = [
             self.make_simple_package_import(required_import)
-            for required_import in self.required_imports
+            for required_import in sorted(self.required_imports)
         ]
 
+        self.modified = True
         return with_added_imports(updated_node, imports)
 
     def visit_Call(self, node: cst.Call) -> Optional[bool]:
-        if m.matches(node, gen_task_matcher):
+        if self.is_gen_task(node):
             raise TransformError(
                 "gen.Task (https://www.tornadoweb.org/en/branch2.4/gen.html#tornado.gen.Task) from tornado 2.4.1 is unsupported by this codemod. This file has not been modified. Manually update to supported syntax before running again."
             )
@@ -79,8 +169,9 @@ class TornadoAsyncTransformer(cst.CSTTransformer):
         if not self.in_coroutine(self.coroutine_stack):
             return updated_node
 
-        if m.matches(updated_node, gen_sleep_matcher):
+        if self.is_gen_sleep(node):
             self.required_imports.add("asyncio")
+            self.modified = True
             return updated_node.with_changes(
                 func=cst.Attribute(value=cst.Name("asyncio"), attr=cst.Name("sleep"))
             )
@@ -88,7 +179,22 @@ class TornadoAsyncTransformer(cst.CSTTransformer):
         return updated_node
 
     def visit_FunctionDef(self, node: cst.FunctionDef) -> Optional[bool]:
-        self.coroutine_stack.append(m.matches(node, coroutine_matcher))
+        is_coroutine = node.asynchronous is None and any(
+            self.is_coroutine_decorator(decorator) for decorator in node.decorators
+        )
+        if is_coroutine and self.checking and not self.may_call_gen_task():
+            raise _CoroutineFound()
+
+        self.coroutine_stack.append(is_coroutine)
+        if is_coroutine:
+            self.removed_decorators_stack.append(
+                frozenset(
+                    index
+                    for index, decorator in enumerate(node.decorators)
+                    if self.is_gen_coroutine_decorator(decorator)
+                )
+            )
+
         # always continue to visit function
         return True
 
@@ -99,11 +205,13 @@ class TornadoAsyncTransformer(cst.CSTTransformer):
         if not leaving_coroutine:
             return updated_node
 
+        removed_decorators = self.removed_decorators_stack.pop()
+        self.modified = True
         return updated_node.with_changes(
             decorators=[
                 decorator
-                for decorator in updated_node.decorators
-                if not m.matches(decorator, gen_coroutine_decorator_matcher)
+                for index, decorator in enumerate(updated_node.decorators)
+                if index not in removed_decorators
             ],
             asynchronous=cst.Asynchronous(),
         )
@@ -114,10 +222,11 @@ class TornadoAsyncTransformer(cst.CSTTransformer):
         if not self.in_coroutine(self.coroutine_stack):
             return updated_node
 
-        if not m.matches(node, gen_return_matcher):
+        if not self.is_gen_return(node):
             return updated_node
 
         return_value, whitespace_after = self.pluck_gen_return_value(updated_node)
+        self.modified = True
         return cst.Return(
             value=return_value,
             whitespace_after_return=whitespace_after,
@@ -126,7 +235,7 @@ class TornadoAsyncTransformer(cst.CSTTransformer):
 
     def leave_Yield(
         self, node: cst.Yield, updated_node: cst.Yield
-    ) -> Union[cst.Await, cst.Yield]:
+    ) -> cst.BaseExpression:
         if not self.in_coroutine(self.coroutine_stack):
             return updated_node
 
@@ -139,17 +248,19 @@ class TornadoAsyncTransformer(cst.CSTTransformer):
                 updated_node
             )
 
-        elif m.matches(
-            updated_node,
-            m.Yield(value=((m.Dict() | m.DictComp())) | m.Call(func=m.Name("dict"))),
-        ):
-            raise TransformError(
-                "Yielding a dict of futures (https://www.tornadoweb.org/en/branch3.2/releases/v3.2.0.html#tornado-gen) added in tornado 3.2 is unsupported by the codemod. This file has not been modified. Manually update to supported syntax before running again."
-            )
+        elif m.matches(updated_node.value, dict_of_futures_matcher):
+            # the futures are awaited inside of the expression that rebuilds
+            # the dict, so there's no await to replace the yield with
+            self.required_imports.add("asyncio")
+            self.modified = True
+            return self.pluck_asyncio_gather_expression_from_yield_dict(
+                updated_node
+            ).with_changes(lpar=updated_node.lpar, rpar=updated_node.rpar)
 
         else:
             expression = updated_node.value
 
+        self.modified = True
         return cst.Await(
             expression=expression,
             whitespace_after_await=updated_node.whitespace_after_yield,
@@ -157,6 +268,39 @@ class TornadoAsyncTransformer(cst.CSTTransformer):
             rpar=updated_node.rpar,
         )
 
+    def may_call_gen_task(self) -> bool:
+        return self.possible_trigger_names is None or bool(
+            gen_task_names & self.possible_trigger_names
+        )
+
+    def is_coroutine_decorator(self, node: cst.Decorator) -> bool:
+        return matches_by_terminal_name(
+            node, node.decorator, coroutine_decorator_names, coroutine_decorator_matcher
+        )
+
+    def is_gen_coroutine_decorator(self, node: cst.Decorator) -> bool:
+        return matches_by_terminal_name(
+            node,
+            node.decorator,
+            gen_coroutine_decorator_names,
+            gen_coroutine_decorator_matcher,
+        )
+
+    def is_gen_return(self, node: cst.Raise) -> bool:
+        return node.exc is not None and matches_by_terminal_name(
+            node, node.exc, gen_return_names, gen_return_matcher
+        )
+
+    def is_gen_sleep(self, node: cst.Call) -> bool:
+        return matches_by_terminal_name(
+            node, node.func, gen_sleep_names, gen_sleep_matcher
+        )
+
+    def is_gen_task(self, node: cst.Call) -> bool:
+        return matches_by_terminal_name(
+            node, node.func, gen_task_names, gen_task_matcher
+        )
+
     @staticmethod
     def pluck_asyncio_gather_expression_from_yield_list_or_list_comp(
         node: cst.Yield,
@@ -166,6 +310,101 @@ class TornadoAsyncTransformer(cst.CSTTransformer):
             args=[cst.Arg(value=node.value, star="*")],
         )
 
+    @classmethod
+    def pluck_asyncio_gather_expression_from_yield_dict(
+        cls, node: cst.Yield
+    ) -> cst.BaseExpression:
+        """
+        Gathers the futures in a dict concurrently, like tornado did when
+        yielding one, and zips the results back up with their keys. If every
+        key is simple, e.g. `yield {a: f(), "b": g()}` or `yield dict(a=f())`,
+        the keys and futures are split up:
+
+            dict(zip((a, "b"), await asyncio.gather(f(), g())))
+
+        Any other dict, e.g. a dict comprehension, is only evaluated once to
+        gather its values:
+
+            {key: value for futures in [<dict>] for key, value in zip(futures, await asyncio.gather(*futures.values()))}
+        """
+        keys_and_futures = cls.split_keys_and_futures(node.value)
+        if keys_and_futures is not None:
+            keys, futures = keys_and_futures
+            return cls.make_call(
+                "dict",
+                cls.make_call(
+                    "zip",
+                    cst.Tuple([cst.Element(key) for key in keys]),
+                    cst.Await(cls.make_call("asyncio.gather", *futures)),
+                ),
+            )
+
+        # the names are local to the comprehension, and the dict itself is
+        # evaluated outside of it, so they can't clash with the coroutine's own
+        gather = cls.make_call("asyncio.gather").with_changes(
+            args=[cst.Arg(value=cls.make_call("futures.values"), star="*")]
+        )
+        return cst.DictComp(
+            key=cst.Name("key"),
+            value=cst.Name("value"),
+            for_in=cst.CompFor(
+                target=cst.Name("futures"),
+                iter=cst.List([cst.Element(node.value)]),
+                inner_for_in=cst.CompFor(
+                    target=cst.Tuple(
+                        [cst.Element(cst.Name("key")), cst.Element(cst.Name("value"))],
+                        lpar=[],
+                        rpar=[],
+                    ),
+                    iter=cls.make_call("zip", cst.Name("futures"), cst.Await(gather)),
+                ),
+            ),
+        )
+
+    @staticmethod
+    def split_keys_and_futures(
+        value: cst.BaseExpression,
+    ) -> Optional[Tuple[List[cst.BaseExpression], List[cst.BaseExpression]]]:
+        """
+        The keys and futures of a dict display or `dict()` call with only
+        simple keys, in order, or None if it has any other keys (or isn't one).
+        Dicts with comments aren't split up either, since the comments would
+        be lost along with the whitespace between the elements.
+        """
+        if m.findall(value, m.Comment()):
+            return None
+
+        keys: List[cst.BaseExpression] = []
+        futures: List[cst.BaseExpression] = []
+        if isinstance(value, cst.Dict):
+            for element in value.elements:
+                if not isinstance(element, cst.DictElement) or not m.matches(
+                    element.key, simple_dict_key_matcher
+                ):
+                    return None
+                keys.append(element.key)
+                futures.append(element.value)
+        elif isinstance(value, cst.Call):
+            for arg in value.args:
+                if arg.keyword is None or arg.star:
+                    return None
+                keys.append(cst.SimpleString('"{}"'.format(arg.keyword.value)))
+                futures.append(arg.value)
+        else:
+            return None
+        return keys, futures
+
+    @staticmethod
+    def make_call(function: str, *args: cst.BaseExpression) -> cst.Call:
+        """
+        A call to `function`, which may be a dotted name, with positional `args`.
+        """
+        names = function.split(".")
+        func: cst.BaseExpression = cst.Name(names[0])
+        for name in names[1:]:
+            func = cst.Attribute(value=func, attr=cst.Name(name))
+        return cst.Call(func=func, args=[cst.Arg(value=arg) for arg in args])
+
     @staticmethod
     def in_coroutine(coroutine_stack: List[bool]) -> bool:
         if not coroutine_stack:
@@ -177,7 +416,9 @@ class TornadoAsyncTransformer(cst.CSTTransformer):
     def pluck_gen_return_value(
         node: cst.Raise,
     ) -> Tuple[Optional[cst.BaseExpression], cst.SimpleWhitespace]:
-        if m.matches(node, gen_return_call_with_args_matcher):
+        # the caller has already checked that this raises gen.Return, however
+        # it happens to be spelled
+        if isinstance(node.exc, cst.Call) and node.exc.args:
             return node.exc.args[0].value, node.whitespace_after_raise
 
         # if there's no return value, we don't preserve whitespace after 'raise'
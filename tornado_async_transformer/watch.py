@@ -0,0 +1,383 @@
+"""
+Watching directories for changed python files, to re-transform just those
+files as they're saved.
+
+On linux, changes are picked up with inotify (through ctypes, so there are no
+extra dependencies). Elsewhere, or if inotify can't be set up, the files are
+polled for changes instead.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import multiprocessing
+import os
+import select
+import struct
+import sys
+import time
+from collections import Counter
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from tornado_async_transformer.cache import ResultCache
+from tornado_async_transformer.discovery import is_python_filename, walk
+from tornado_async_transformer.tool import (
+    DEFAULT_MAX_BYTES_IN_FLIGHT,
+    FileResult,
+    summarize,
+    transform_files,
+)
+
+# from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# files are only looked at once they've been written and closed, or moved into
+# place, which is how editors save them. New directories are watched as they
+# show up.
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event {int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[];}
+_event_header = struct.Struct("iIII")
+
+# returns the python files to watch and the directories they were found in
+Discover = Callable[[], Tuple[List[str], Set[str]]]
+
+# a file's modification time, size and inode, to tell whether it changed
+Signature = Tuple[int, int, int]
+
+
+def _signature(filename: str) -> Optional[Signature]:
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def discover(
+    bases: Sequence[str], exclude: Sequence[str] = (), use_gitignore: bool = True
+) -> Tuple[List[str], Set[str]]:
+    """
+    The python files in `bases`, along with the (normalized) directories that
+    were walked to find them.
+    """
+    filenames: List[str] = []
+    directories: Set[str] = set()
+    for base in bases:
+        if os.path.isfile(base):
+            directories.add(os.path.dirname(os.path.normpath(base)) or ".")
+        for path, is_directory in walk(base, exclude, use_gitignore):
+            if is_directory:
+                directories.add(os.path.normpath(path))
+            else:
+                filenames.append(path)
+    return filenames, directories
+
+
+class PollingWatcher:
+    """
+    Finds changed files by rediscovering and stat-ing every file each poll.
+    This works everywhere, but costs a walk of the whole tree per poll.
+    """
+
+    def __init__(self, discover: Discover, interval: float = 1.0) -> None:
+        self.discover = discover
+        self.interval = interval
+        self.filenames: List[str] = []
+        self.signatures = self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Optional[Signature]]:
+        self.filenames, _ = self.discover()
+        return {filename: _signature(filename) for filename in self.filenames}
+
+    def poll(self, timeout: Optional[float]) -> Set[str]:
+        """
+        Waits up to `timeout` seconds (forever if None) for files to change,
+        returning the changed files, if any.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is None:
+                time.sleep(self.interval)
+            else:
+                time.sleep(max(0.0, min(self.interval, remaining)))
+
+            signatures = self._snapshot()
+            changed = {
+                filename
+                for filename, signature in signatures.items()
+                if signature != self.signatures.get(filename)
+            }
+            self.signatures = signatures
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """
+    Finds changed files with inotify watches on every directory that's walked
+    to discover files. Files are only rediscovered when new files or
+    directories show up.
+    """
+
+    def __init__(self, discover: Discover) -> None:
+        self.libc = _load_libc()
+        if self.libc is None:
+            raise OSError(errno.ENOSYS, "inotify isn't available")
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.discover = discover
+        self.directories: Dict[int, str] = {}
+        self.filenames: List[str] = []
+        # discovered filenames by their normalized path, which is how they're
+        # rebuilt from events
+        self.files: Dict[str, str] = {}
+        try:
+            self._refresh()
+        except OSError:
+            self.close()
+            raise
+
+    def _refresh(self) -> None:
+        self.filenames, directories = self.discover()
+        self.files = {
+            os.path.normpath(filename): filename for filename in self.filenames
+        }
+        for directory in directories - set(self.directories.values()):
+            descriptor = self.libc.inotify_add_watch(
+                self.fd, os.fsencode(directory), WATCH_MASK
+            )
+            if descriptor < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOENT:
+                    continue
+                # most likely out of watches (ENOSPC), which polling doesn't need
+                raise OSError(error, "inotify_add_watch failed", directory)
+            self.directories[descriptor] = directory
+
+    def _read_events(self, timeout: Optional[float]) -> Iterator[Tuple[int, int, str]]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return
+
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset < len(buffer):
+            descriptor, mask, _, length = _event_header.unpack_from(buffer, offset)
+            offset += _event_header.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+            yield descriptor, mask, os.fsdecode(name)
+
+    def poll(self, timeout: Optional[float]) -> Set[str]:
+        """
+        Waits up to `timeout` seconds (forever if None) for files to change,
+        returning the changed files, if any.
+        """
+        changed: Set[str] = set()
+        rediscover = False
+        for descriptor, mask, name in self._read_events(timeout):
+            if mask & IN_Q_OVERFLOW:
+                # events were lost, so anything could have changed
+                rediscover = True
+                changed.update(self.files)
+                continue
+
+            if mask & IN_IGNORED:
+                self.directories.pop(descriptor, None)
+                continue
+
+            directory = self.directories.get(descriptor)
+            if directory is None or not name:
+                continue
+
+            # normalized like self.files, since e.g. "./a.py" is "a.py" there
+            path = os.path.normpath(os.path.join(directory, name))
+            if mask & IN_ISDIR:
+                rediscover = rediscover or bool(mask & (IN_CREATE | IN_MOVED_TO))
+            elif is_python_filename(name):
+                rediscover = rediscover or path not in self.files
+                changed.add(path)
+
+        if rediscover:
+            self._refresh()
+        return {self.files[path] for path in changed if path in self.files}
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    if not sys.platform.startswith("linux"):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def make_watcher(
+    bases: Sequence[str],
+    exclude: Sequence[str] = (),
+    use_gitignore: bool = True,
+    poll: bool = False,
+    poll_interval: float = 1.0,
+) -> "Watcher":
+    """
+    An inotify watcher over the python files in `bases`, or a polling watcher
+    if `poll` is set or inotify isn't available.
+    """
+
+    def rediscover() -> Tuple[List[str], Set[str]]:
+        return discover(bases, exclude, use_gitignore)
+
+    if not poll:
+        try:
+            return InotifyWatcher(rediscover)
+        except OSError:
+            pass
+    return PollingWatcher(rediscover, poll_interval)
+
+
+Watcher = Union[InotifyWatcher, PollingWatcher]
+
+
+def wait_for_changes(watcher: Watcher, debounce: float) -> Set[str]:
+    """
+    Blocks until files change, then keeps collecting changes until none have
+    come in for `debounce` seconds, so that e.g. an editor saving several
+    files (or one file several times) leads to a single run.
+    """
+    changed = watcher.poll(None)
+    while True:
+        more = watcher.poll(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+def watch(
+    bases: Sequence[str],
+    exclude: Sequence[str] = (),
+    use_gitignore: bool = True,
+    jobs: int = 1,
+    cache: Optional[ResultCache] = None,
+    resolve_imports: bool = False,
+    debounce: float = 0.2,
+    poll: bool = False,
+    poll_interval: float = 1.0,
+    chunk_lines: Optional[int] = None,
+    file_timeout: Optional[float] = None,
+    file_max_rss: Optional[int] = None,
+    max_bytes_in_flight: int = DEFAULT_MAX_BYTES_IN_FLIGHT,
+) -> Iterator[List[FileResult]]:
+    """
+    Transforms every python file in `bases`, then watches them and
+    re-transforms files as they change, forever. Yields the results of the
+    first run, then of every run after a change. The rest of the arguments
+    are passed on to `transform_files`.
+
+    The worker processes are started once and kept warm for the whole session,
+    and the tool's own writes to files don't count as changes. Supervised
+    workers (with `file_timeout` or `file_max_rss`) are started per run
+    instead, since they're replaced whenever one goes over budget anyway.
+    """
+    watcher = make_watcher(bases, exclude, use_gitignore, poll, poll_interval)
+    supervised = file_timeout is not None or file_max_rss is not None
+    pool = multiprocessing.Pool(processes=jobs) if jobs > 1 and not supervised else None
+    signatures: Dict[str, Optional[Signature]] = {}
+
+    def run(filenames: Iterable[str]) -> List[FileResult]:
+        results = list(
+            transform_files(
+                filenames,
+                jobs=jobs,
+                cache=cache,
+                resolve_imports=resolve_imports,
+                pool=pool,
+                chunk_lines=chunk_lines,
+                file_timeout=file_timeout,
+                file_max_rss=file_max_rss,
+                max_bytes_in_flight=max_bytes_in_flight,
+            )
+        )
+        for result in results:
+            signatures[result.filename] = _signature(result.filename)
+        return results
+
+    try:
+        yield run(watcher.filenames)
+
+        while True:
+            changed = sorted(
+                filename
+                for filename in wait_for_changes(watcher, debounce)
+                if os.path.isfile(filename)
+                and _signature(filename) != signatures.get(filename)
+            )
+            if changed:
+                yield run(changed)
+    finally:
+        watcher.close()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def print_runs(runs: Iterable[List[FileResult]]) -> None:
+    """
+    Prints which files were transformed or failed to be in each run, followed
+    by a summary of the run.
+    """
+    for results in runs:
+        outcomes: Counter = Counter()
+        for result in results:
+            outcomes[result.outcome] += 1
+            if result.changed:
+                print("{} transformed".format(result.filename))
+            if result.error is not None:
+                print(
+                    "{} {}: {}".format(
+                        result.filename, result.outcome.value, result.error
+                    )
+                )
+        print(
+            summarize(outcomes, sum(result.cached for result in results)),
+            file=sys.stderr,
+        )
+        print("Watching for changes, press Ctrl-C to stop.", file=sys.stderr)